@@ -0,0 +1,240 @@
+from bisect import bisect_left
+from collections.abc import MutableMapping
+from heapq import heappush, heappop
+from characters.stat_vector import *
+
+
+class ActionQueue:
+    """
+    A priority queue used by the operating system to decide whose turn it is.\n
+    Each unit is kept in a binary heap as an entry [arrival: float, order: int, unit: Unit], where arrival is the
+    absolute time (the same clock as RailOperatingSystem.time_passed) at which the unit reaches the endpoint.
+    Passing time doesn't change arrival times, so only the units whose distance or speed changed need to be
+    rescheduled. A rescheduled unit gets a new entry and the old one is left in the heap and skipped when it reaches
+    the top (lazy invalidation).
+    Units with the same arrival time are ordered the same way the old sorted list was ordered. That list was stably
+    sorted after every turn, so among tied units, the one that was ahead before the turn stays ahead. order is the
+    tie-breaker that does the same. The turn order isn't always exactly the same, though. The old list subtracted
+    the time passed from every unit after every turn, so its rounding errors differ from the ones of absolute arrival
+    times. Units that would arrive together with exact arithmetic may come in another order (the old list broke such
+    ties by rounding noise too), and a turn that arrives right at the end of the battle may fall on the other side of
+    it.\n
+    The queue also works as a virtual clock. Instead of moving every unit a bit closer to the endpoint whenever time
+    passes, it records the distance of each unit at a reference time together with the speed the unit has been
+    moving at since then. The distance at any later time is computed only when someone reads it or when the unit's
+    speed changes. So passing time costs nothing no matter how many units are in the battle.\n
+    The queue doesn't look at every unit to find speed changes either. A unit puts itself in stat_changes when its
+    runtime stats change, and only those units have their speed checked.
+
+    Attributes:
+    ----------
+    heap: list
+        The heap of entries, including the invalidated ones
+    entries: dict
+        The live entry of each unit
+    references: dict
+        The (time: float, distance: float) pair of each unit, i.e. its distance to the endpoint at that time
+    speeds: dict
+        The speed each unit has been moving at since its reference time
+    stat_changes: set
+        The units whose runtime stats have changed since the last update (see Unit.runtime_stats_changed(.))
+    touched: dict
+        The units that need to be rescheduled mapped to their entries before the change
+    order: list
+        The live entries sorted by arrival, an entry is moved when its unit is rescheduled
+    ordered_units: list
+        The units of the entries in order, see units(.)
+    front: int
+        The smallest tie-breaker handed out so far
+    back: int
+        The largest tie-breaker handed out so far
+    """
+
+    def __init__(self, units, distance):
+        """
+        Parameters:
+        ----------
+        units: list
+            The units in the battle in the order used to break ties
+        distance: float
+            The distance from the starting position to the endpoint
+        """
+        self.heap = []
+        self.entries = {}
+        self.references = {}
+        self.speeds = {}
+        self.stat_changes = set()
+        self.touched = {}
+        for order, unit in enumerate(units):
+            speed = unit.runtime_stats.array[Stat.SPD]
+            self.references[unit] = (0, distance)
+            self.speeds[unit] = speed
+            # basic math, time = distance/speed
+            entry = [distance / speed, order, unit]
+            heappush(self.heap, entry)
+            self.entries[unit] = entry
+        self.front = 0
+        self.back = len(units) - 1
+        self.order = sorted(self.entries.values())
+        self.ordered_units = [entry[2] for entry in self.order]
+
+    def peek(self):
+        """
+        Finds the unit that takes the next turn.
+
+        Returns:
+        -------
+        The arrival time of the unit and the unit
+        """
+        heap = self.heap
+        entry = heap[0]
+        # drop the invalidated entries
+        while self.entries[entry[2]] is not entry:
+            heappop(heap)
+            entry = heap[0]
+        return entry[0], entry[2]
+
+    def units(self):
+        """
+        Lists the units in the order they take turns. The list is kept in order as the units are rescheduled, so it
+        changes in the next update and shouldn't be changed by the caller.
+
+        Returns:
+        -------
+        A list of units
+        """
+        return self.ordered_units
+
+    def get_distance(self, unit, time):
+        """
+        Computes the distance from the unit to the endpoint.
+
+        Parameters:
+        ----------
+        unit: Unit
+            The unit to be checked
+        time: float
+            The current time
+
+        Returns:
+        -------
+        The distance at the given time
+        """
+        reference_time, distance = self.references[unit]
+        if time == reference_time:
+            return distance
+        # basic math, distance = speed*time
+        return distance - self.speeds[unit] * (time - reference_time)
+
+    def set_distance(self, unit, distance, time):
+        """
+        Moves the unit so it is the given distance away from the endpoint. It will be rescheduled in the next update.
+
+        Parameters:
+        ----------
+        unit: Unit
+            The unit to be moved
+        distance: float
+            The new distance
+        time: float
+            The current time
+        """
+        self.references[unit] = (time, distance)
+        if unit not in self.touched:
+            self.touched[unit] = self.entries[unit]
+
+    def update(self, time):
+        """
+        Reschedules the units that were moved and the units whose speed has changed.
+
+        Parameters:
+        ----------
+        time: float
+            The current time
+        """
+        touched = self.touched
+        # only the units whose runtime stats have changed can have a new speed
+        if self.stat_changes:
+            speeds = self.speeds
+            for unit in self.stat_changes:
+                if unit not in speeds:
+                    continue
+                speed = unit.runtime_stats.array[Stat.SPD]
+                if speed != speeds[unit]:
+                    # the unit has been moving at the old speed until now
+                    self.references[unit] = (time, self.get_distance(unit, time))
+                    speeds[unit] = speed
+                    if unit not in touched:
+                        touched[unit] = self.entries[unit]
+            self.stat_changes.clear()
+        if not touched:
+            return
+        moved_back = []
+        moved_forward = []
+        for unit in touched:
+            old_entry = touched[unit]
+            reference_time, distance = self.references[unit]
+            # basic math, time = distance/speed
+            arrival = reference_time + distance / self.speeds[unit]
+            if arrival > old_entry[0]:
+                moved_back.append((old_entry, arrival))
+            elif arrival < old_entry[0]:
+                moved_forward.append((old_entry, arrival))
+        self.touched = {}
+        # a unit that arrives later than before was ahead of the units it now ties with, so it goes in front of them
+        # a unit that arrives earlier than before goes behind them
+        # units moved in the same turn keep their old relative order
+        moved_back.sort()
+        moved_forward.sort()
+        for old_entry, arrival in reversed(moved_back):
+            self.front -= 1
+            self.__push(old_entry, [arrival, self.front, old_entry[2]])
+        for old_entry, arrival in moved_forward:
+            self.back += 1
+            self.__push(old_entry, [arrival, self.back, old_entry[2]])
+
+    def __push(self, old_entry, entry):
+        heappush(self.heap, entry)
+        self.entries[entry[2]] = entry
+        # no two entries have the same arrival and tie-breaker, so the units are never compared
+        order = self.order
+        index = bisect_left(order, old_entry)
+        del order[index]
+        del self.ordered_units[index]
+        index = bisect_left(order, entry)
+        order.insert(index, entry)
+        self.ordered_units.insert(index, entry[2])
+
+
+class DistanceView(MutableMapping):
+    """
+    A dictionary-like view of the distances kept by an ActionQueue.\n
+    Reading an item computes the unit's current distance and writing one moves the unit, so code written for a plain
+    {unit: distance} dictionary keeps working, e.g. distances[unit] -= 0.5 * 10000.
+
+    Attributes:
+    ----------
+    queue: ActionQueue
+        The queue that keeps the distances
+    clock: function
+        A function that returns the current time
+    """
+
+    def __init__(self, queue, clock):
+        self.queue = queue
+        self.clock = clock
+
+    def __getitem__(self, unit):
+        return self.queue.get_distance(unit, self.clock())
+
+    def __setitem__(self, unit, distance):
+        self.queue.set_distance(unit, distance, self.clock())
+
+    def __delitem__(self, unit):
+        raise TypeError("units can't be removed from the queue")
+
+    def __iter__(self):
+        return iter(self.queue.references)
+
+    def __len__(self):
+        return len(self.queue.references)
@@ -0,0 +1,179 @@
+from abc import ABC, abstractmethod
+
+# verbosity levels of the battle log, a log shows the lines of its own level and all lower levels
+# nothing is logged
+OFF = 0
+# the start of each turn (time and skill points)
+TURNS = 1
+# the actions taken in each turn
+ACTIONS = 2
+# the results of each command (damage, healing, breaks, etc.)
+DETAILS = 3
+
+
+class BattleLog(ABC):
+    """
+    Where the operating system writes the transcript of the battle.\n
+    Lines are only formatted when their level is enabled, so a quiet log costs almost nothing. The subclasses decide
+    where the text goes: streamed to a file or stdout, buffered in memory, or dropped.
+
+    Attributes:
+    ----------
+    level: int
+        The highest verbosity level that is written, one of OFF, TURNS, ACTIONS and DETAILS
+    """
+
+    def __init__(self, level=DETAILS):
+        self.level = level
+
+    def enabled(self, level):
+        """
+        Checks if the lines of a verbosity level are written.
+
+        Parameters:
+        ----------
+        level: int
+            The verbosity level
+
+        Returns:
+        -------
+        True if the level is enabled
+        """
+        return level <= self.level
+
+    def write(self, level, text):
+        """
+        Writes some already formatted text.
+
+        Parameters:
+        ----------
+        level: int
+            The verbosity level of the text
+        text: str
+            The text to be written
+        """
+        if level <= self.level:
+            self.emit(text)
+
+    def format(self, level, formatter, *args):
+        """
+        Formats some text and writes it. The formatter isn't called if the level is disabled.
+
+        Parameters:
+        ----------
+        level: int
+            The verbosity level of the text
+        formatter: function
+            A function that returns the text, e.g. format_dmg(target, dmg)
+        args:
+            The arguments of the formatter
+        """
+        if level <= self.level:
+            self.emit(formatter(*args))
+
+    @abstractmethod
+    def emit(self, text):
+        """
+        Sends the text to wherever the log goes.
+
+        Parameters:
+        ----------
+        text: str
+            The text to be written
+        """
+        pass
+
+    def close(self):
+        """
+        Called by the operating system when the battle ends.
+        """
+        pass
+
+
+class NullLog(BattleLog):
+    """
+    A log that drops everything.
+    """
+
+    def __init__(self):
+        super(NullLog, self).__init__(OFF)
+
+    def emit(self, text):
+        pass
+
+
+class StreamLog(BattleLog):
+    """
+    A log that streams the text to a file-like object (e.g. sys.stdout) as soon as it is written.
+
+    Attributes:
+    ----------
+    stream:
+        The file-like object to write to
+    """
+
+    def __init__(self, stream, level=DETAILS):
+        super(StreamLog, self).__init__(level)
+        self.stream = stream
+
+    def emit(self, text):
+        self.stream.write(text)
+
+    def close(self):
+        self.stream.flush()
+
+
+class FileLog(StreamLog):
+    """
+    A log that streams the text to a file. The file is closed when the battle ends.
+    """
+
+    def __init__(self, path, level=DETAILS):
+        """
+        Parameters:
+        ----------
+        path: str
+            The path of the file, an existing file is overwritten
+        level: int
+            The highest verbosity level that is written
+        """
+        super(FileLog, self).__init__(open(path, "w"), level)
+
+    def close(self):
+        self.stream.close()
+
+
+class BufferedLog(BattleLog):
+    """
+    A log that keeps the text in a list and joins it only when it is needed.
+
+    Attributes:
+    ----------
+    parts: list
+        The pieces of text written so far
+    stream:
+        The file-like object the whole transcript is written to when the battle ends, or None to keep it in memory
+    """
+
+    def __init__(self, level=DETAILS, stream=None):
+        super(BufferedLog, self).__init__(level)
+        self.parts = []
+        self.stream = stream
+
+    def emit(self, text):
+        self.parts.append(text)
+
+    def getvalue(self):
+        """
+        Returns:
+        -------
+        The transcript written so far as a string
+        """
+        text = "".join(self.parts)
+        # keep the joined string so the next call doesn't join everything again
+        self.parts = [text]
+        return text
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.write(self.getvalue())
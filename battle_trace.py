@@ -0,0 +1,300 @@
+from collections import namedtuple
+from json import dumps, loads
+from mmap import mmap, ACCESS_READ
+from struct import Struct
+from events import *
+from characters.buff import *
+from characters.tags import *
+
+# a trace file is a sequence of fixed-width little-endian records followed by a json footer
+# the footer holds the names of the units, event types and tags the records refer to by index
+# the last 8 bytes of the file are the offset of the footer
+#
+# each event on the blackboard is written as one record per target (or one record if it has no targets)
+# the records of the same event share the same event number
+# an event with empty data (e.g. a Debuff command where no debuff landed) gets a record with no target and no payload,
+# so every event number is in the trace
+# record fields:
+#   time: double, the battle time when the event happened
+#   event: uint32, the event number
+#   code: uint16, the code of the command/action type (see events.py)
+#   unit: uint16, the unit that proposed the command/action
+#   target: uint16, the target unit or NONE
+#   tag: uint16, the tag of the record or NONE, e.g. the DMG tags ("Skill Wind"), the buff/debuff ID, the break type
+#   value: double, e.g. the final damage, the actual healing, the debuff value, the skill points gained
+#   extra: double, e.g. the break damage, the debuff stacks
+#   flag: uint8, e.g. whether the damage critically hits
+RECORD = Struct("<dIHHHHddB")
+FOOTER_OFFSET = Struct("<Q")
+NONE = 0xFFFF
+MAGIC = "StarRailTrace"
+VERSION = 1
+
+TraceRecord = namedtuple("TraceRecord", ("time", "event", "type", "unit", "target", "tag", "value", "extra", "flag"))
+
+
+def decode_event(data):
+    """
+    Splits the data of an event into records.\n
+    Works out the meaning of each field from its type, so the commands registered by other modules are recorded too.
+
+    Parameters:
+    ----------
+    data: Any
+        The data of an event on the blackboard
+
+    Returns:
+    -------
+    A list of (target, tag, value, extra, flag) tuples, with at least one tuple
+    """
+    if not isinstance(data, (tuple, list)):
+        # e.g. Gain SP, Lose SP
+        return [(None, None, data, None, False)]
+    rows = []
+    for item in data:
+        if not isinstance(item, (tuple, list)):
+            # the targets of an action or an attack
+            rows.append((item, None, None, None, False))
+            continue
+        tag = None
+        numbers = []
+        flag = False
+        for field in item[1:]:
+            if isinstance(field, bool):
+                flag = field
+            elif isinstance(field, (int, float)):
+                numbers.append(field)
+            elif isinstance(field, str):
+                # e.g. the dmg type of Break
+                tag = field
+            elif isinstance(field, (dict, Buff)):
+                # a buff or a debuff
+                tag = field.get("ID")
+                numbers.append(field.get("Value"))
+                numbers.append(field.get("Stack"))
+            elif type(field) is Tags:
+                # DMG tags
+                tag = field.name
+            elif isinstance(field, tuple) and field and isinstance(field[0], str):
+                tag = " ".join(field)
+            elif isinstance(field, tuple):
+                # (dmg, break_dmg)
+                numbers.extend(field)
+        value = numbers[0] if len(numbers) > 0 else None
+        extra = numbers[1] if len(numbers) > 1 else None
+        rows.append((item[0], tag, value, extra, flag))
+    if not rows:
+        # a placeholder, the event still happened
+        rows.append((None, None, None, None, False))
+    return rows
+
+
+class TraceRecorder:
+    """
+    Writes every event of a battle (actions, commands and the resolved DMG/Heal/Debuff results) to a binary file.\n
+    Pass it to RailOperatingSystem as trace=TraceRecorder(path). The records are packed into a buffer and written in
+    blocks, and the file is finished when the battle ends. Read it back with TraceReader.
+
+    Attributes:
+    ----------
+    file:
+        The file being written
+    buffer: bytearray
+        The records not written yet
+    buffer_size: int
+        How many records are buffered before they are written
+    count: int
+        How many records are in the buffer
+    events: int
+        How many events have been recorded
+    units: dict
+        The index of each unit, in the order they first appear
+    unit_names: list
+        The name of each unit
+    tags: dict
+        The index of each tag
+    """
+
+    def __init__(self, path, buffer_size=4096):
+        """
+        Parameters:
+        ----------
+        path: str
+            The path of the trace file, an existing file is overwritten
+        buffer_size: int
+            How many records are buffered before they are written
+        """
+        self.file = open(path, "wb")
+        self.buffer_size = buffer_size
+        self.buffer = bytearray(RECORD.size * buffer_size)
+        self.count = 0
+        self.events = 0
+        self.units = {}
+        self.unit_names = []
+        self.tags = {}
+
+    def unit_index(self, unit):
+        """
+        Finds the index of a unit, or assigns a new index if the unit is new (NONE for no unit).
+        """
+        if unit is None:
+            return NONE
+        index = self.units.get(unit)
+        if index is None:
+            index = len(self.unit_names)
+            self.units[unit] = index
+            self.unit_names.append(unit.name)
+        return index
+
+    def tag_index(self, tag):
+        """
+        Finds the index of a tag, or assigns a new index if the tag is new (NONE for no tag).
+        """
+        if tag is None:
+            return NONE
+        index = self.tags.get(tag)
+        if index is None:
+            index = len(self.tags)
+            self.tags[tag] = index
+        return index
+
+    def record(self, time, code, unit, data):
+        """
+        Records an event.
+
+        Parameters:
+        ----------
+        time: float
+            The battle time
+        code: int
+            The code of the command/action type
+        unit: Unit
+            The unit that proposed the command/action
+        data: Any
+            The data of the event
+        """
+        unit_index = self.unit_index(unit)
+        for target, tag, value, extra, flag in decode_event(data):
+            if self.count == self.buffer_size:
+                self.flush()
+            RECORD.pack_into(
+                self.buffer, self.count * RECORD.size,
+                time, self.events, code, unit_index, self.unit_index(target), self.tag_index(tag),
+                float("nan") if value is None else value, float("nan") if extra is None else extra, flag
+            )
+            self.count += 1
+        self.events += 1
+
+    def flush(self):
+        """
+        Writes the buffered records to the file.
+        """
+        self.file.write(memoryview(self.buffer)[:self.count * RECORD.size])
+        self.count = 0
+
+    def close(self):
+        """
+        Writes the footer and closes the file. Called by the operating system when the battle ends.
+        """
+        self.flush()
+        footer_offset = self.file.tell()
+        footer = {
+            "magic": MAGIC,
+            "version": VERSION,
+            "records": footer_offset // RECORD.size,
+            "events": self.events,
+            "event_types": EVENT_TYPES,
+            "units": self.unit_names,
+            "tags": sorted(self.tags, key=self.tags.get)
+        }
+        self.file.write(dumps(footer).encode())
+        self.file.write(FOOTER_OFFSET.pack(footer_offset))
+        self.file.close()
+
+
+class TraceReader:
+    """
+    Reads a trace file written by TraceRecorder. The file is memory-mapped, so traces much larger than the memory
+    can be iterated.
+
+    Attributes:
+    ----------
+    event_types: list
+        The name of each event code
+    units: list
+        The name of each unit
+    tags: list
+        The name of each tag
+    records: int
+        How many records are in the file
+    events: int
+        How many events are in the file
+    """
+
+    def __init__(self, path):
+        """
+        Parameters:
+        ----------
+        path: str
+            The path of the trace file
+        """
+        self.file = open(path, "rb")
+        self.map = mmap(self.file.fileno(), 0, access=ACCESS_READ)
+        footer_offset, = FOOTER_OFFSET.unpack_from(self.map, len(self.map) - FOOTER_OFFSET.size)
+        footer = loads(self.map[footer_offset:len(self.map) - FOOTER_OFFSET.size].decode())
+        if footer.get("magic") != MAGIC or footer.get("version") != VERSION:
+            raise ValueError(path + " is not a trace file of version " + str(VERSION))
+        self.footer_offset = footer_offset
+        self.event_types = footer["event_types"]
+        self.units = footer["units"]
+        self.tags = footer["tags"]
+        self.records = footer["records"]
+        self.events = footer["events"]
+
+    def raw_records(self):
+        """
+        Iterates the records without translating the indices to names, the fastest way to scan a trace.
+
+        Returns:
+        -------
+        An iterator of (time, event, code, unit, target, tag, value, extra, flag) tuples
+        """
+        return RECORD.iter_unpack(memoryview(self.map)[:self.footer_offset])
+
+    def __iter__(self):
+        """
+        Iterates the records with the indices translated to names (None for no target/tag).
+        """
+        event_types = self.event_types
+        units = self.units
+        tags = self.tags
+        for time, event, code, unit, target, tag, value, extra, flag in self.raw_records():
+            yield TraceRecord(
+                time, event, event_types[code], units[unit],
+                None if target == NONE else units[target], None if tag == NONE else tags[tag],
+                value, extra, bool(flag)
+            )
+
+    def __len__(self):
+        return self.records
+
+    def replay(self):
+        """
+        Replays the battle event by event.
+
+        Returns:
+        -------
+        An iterator of (time, event_type, unit, records) where records is a list of the event's TraceRecords
+        """
+        records = []
+        for record in self:
+            if records and record.event != records[0].event:
+                yield records[0].time, records[0].type, records[0].unit, records
+                records = []
+            records.append(record)
+        if records:
+            yield records[0].time, records[0].type, records[0].unit, records
+
+    def close(self):
+        self.map.close()
+        self.file.close()
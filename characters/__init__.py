@@ -1,3 +1,5 @@
 from characters.enemy import *
 from characters.blade import *
-from characters.imbibitor_lunae import *
\ No newline at end of file
+from characters.imbibitor_lunae import *
+from characters.prototype import *
+from characters.dispatch import *
\ No newline at end of file
@@ -36,22 +36,25 @@ class Blade(Character):
         self.stats["DMG Boost"]["Talent"] = 0.2
         self.skill_active = False
         # constant buffs (never decay) can be defined as attributes
-        self.trace_buff = {
-            "ID": "Vita Infinita",
-            "Type": "Incoming Healing Boost",
-            "DMG Type": None,
-            "Value": 0.2,
-            "Value Type": "Flat",
-            "Source": self.decorated_self,
-            "Source Stats": None,
-            "Max Stack": 1,
-            "Stack": 1,
-            "Decay": None,
-            "Turn": None,
-            "Unlock": None,
-            "Locked": True
-        }
-        self.need_to_take_extra_turn = False
+        self.trace_buff = Buff(
+            id="Vita Infinita",
+            type="Incoming Healing Boost",
+            dmg_type=None,
+            value_type="Flat",
+            value=0.2,
+            source=self.decorated_self,
+            source_stats=None,
+            max_stack=1,
+            stack=1,
+            decay=None,
+            turn=None,
+            unlock=None,
+            locked=True
+        )
+        # the extra turn comes from the skill, which asks for it
+        self.requests_extra_turns = True
+        # talent stacks are gained from being attacked or consuming HP
+        self.subscribe_extra_action("End ATK", "Consume HP")
         self.talent_stack = 0
         self.max_talent_stack = 5
         self.lost_hp = 0
@@ -80,9 +83,8 @@ class Blade(Character):
             return "Basic ATK", self.decorated_self, targets
 
     def check_extra_turn(self, enemies, players, sp, blackboard):
-        if self.need_to_take_extra_turn:
-            self.need_to_take_extra_turn = False
-            return self.decorated_self.choose_action(enemies, players, sp)
+        # only called after the skill asked for the extra turn, the request is used up
+        return self.decorated_self.choose_action(enemies, players, sp)
 
     def check_extra_action(self, enemies, players, blackboard):
         if self.talent_stack >= self.max_talent_stack:
@@ -108,12 +110,12 @@ class Blade(Character):
         if step == 1:
             commands.append(("Start ATK", self.decorated_self, targets))
             if self.skill_active:
-                tags = ("Basic ATK", "Enhanced", self.dmg_type)
+                tags = intern_tags("Basic ATK", "Enhanced", self.dmg_type)
                 self.energy += 30 * (1 + energy_regen)
                 dmg_break = ((0.4 * atk + 1 * max_hp) / 2, 60 / 2)
                 commands.append(("Consume HP", self.decorated_self, ((self.decorated_self, 0.1 * max_hp),)))
             else:
-                tags = ("Basic ATK", self.dmg_type)
+                tags = intern_tags("Basic ATK", self.dmg_type)
                 self.energy += 20 * (1 + energy_regen)
                 dmg_break = (1 * atk / 2, 30 / 2)
                 commands.append(("Gain SP", self.decorated_self, 1))
@@ -122,7 +124,7 @@ class Blade(Character):
             return tuple(commands), False
         else:
             if self.skill_active:
-                tags = ("Basic ATK", "Enhanced", self.dmg_type)
+                tags = intern_tags("Basic ATK", "Enhanced", self.dmg_type)
                 dmg_break1 = ((0.4 * atk + 1 * max_hp) / 2, 60 / 2)
                 dmg_break2 = (0.16 * atk + 0.4 * max_hp, 30)
                 data = [(targets[0], dmg_break1, tags)]
@@ -130,7 +132,7 @@ class Blade(Character):
                     data.append((minor_target, dmg_break2, tags))
                 data = tuple(data)
             else:
-                tags = ("Basic ATK", self.dmg_type)
+                tags = intern_tags("Basic ATK", self.dmg_type)
                 dmg_break = (1 * atk / 2, 30 / 2)
                 data = ((targets[0], dmg_break, tags),)
             commands.append(("DMG", self.decorated_self, data))
@@ -147,23 +149,23 @@ class Blade(Character):
     def skill(self, targets, step):
         commands = []
         if not self.skill_active:
-            self.need_to_take_extra_turn = True
+            self.request_extra_turn()
             self.skill_active = True
-            buff = {
-                "ID": "Hellscape",
-                "Type": "DMG Boost",
-                "DMG Type": "All",
-                "Value Type": "Flat",
-                "Source": self.decorated_self,
-                "Source Stats": None,
-                "Value": 0.4,
-                "Max Stack": 1,
-                "Stack": 1,
-                "Decay": "End",
-                "Turn": 3,
-                "Unlock": "Action",
-                "Locked": True
-            }
+            buff = Buff(
+                id="Hellscape",
+                type="DMG Boost",
+                dmg_type="All",
+                value_type="Flat",
+                value=0.4,
+                source=self.decorated_self,
+                source_stats=None,
+                max_stack=1,
+                stack=1,
+                decay="End",
+                turn=3,
+                unlock="Action",
+                locked=True
+            )
             self.decorated_self.add_buff(buff)
             data = ((self.decorated_self, 0.3 * self.runtime_stats["HP"]),)
             commands.append(("Lose SP", self.decorated_self, 1))
@@ -184,7 +186,7 @@ class Blade(Character):
             else:
                 # this is not healing
                 self.hp = half_hp
-        tags = ("Ultimate", self.dmg_type)
+        tags = intern_tags("Ultimate", self.dmg_type)
         atk = self.runtime_stats["ATK"]
         max_hp = self.runtime_stats["HP"]
         dmg_break1 = (0.4 * atk + 1 * max_hp + 1 * self.lost_hp, 60)
@@ -202,7 +204,7 @@ class Blade(Character):
         commands = []
         self.energy += 10 * (1 + self.runtime_stats["Energy Regeneration Rate"])
         self.talent_stack = 0
-        tags = ("Talent", "Follow-Up", self.dmg_type)
+        tags = intern_tags("Talent", "Follow-Up", self.dmg_type)
         dmg_break = (0.44 * self.runtime_stats["ATK"] + 1.1 * self.runtime_stats["HP"], 30)
         data = []
         for target in targets:
@@ -217,10 +219,7 @@ class Blade(Character):
 
     def end_turn(self):
         result = super(Blade, self).end_turn()
-        for buff in self.buffs:
-            if buff["ID"] == "Hellscape":
-                break
-        else:
+        if self.buffs.get("Hellscape") is None:
             self.skill_active = False
         return result
 
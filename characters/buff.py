@@ -0,0 +1,144 @@
+# the keys of the old buff/debuff dictionaries and the attributes of Buff they map to
+BUFF_FIELDS = {
+    "ID": "id",
+    "Type": "type",
+    "DMG Type": "dmg_type",
+    "Value Type": "value_type",
+    "Value": "value",
+    "Source": "source",
+    "Source Stats": "source_stats",
+    "Max Stack": "max_stack",
+    "Stack": "stack",
+    "Decay": "decay",
+    "Turn": "turn",
+    "Unlock": "unlock",
+    "Locked": "locked"
+}
+# the interned prototypes by their fields, see intern_buff(.)
+BUFF_PROTOTYPES = {}
+
+
+class Buff:
+    """
+    A buff or a debuff.\n
+    The attributes are the keys of the dictionaries buffs used to be, e.g. buff.max_stack is buff["Max Stack"], and
+    buff["Max Stack"] still works. A buff can also be a prototype (see intern_buff(.)): adding a prototype to a unit
+    adds a copy of it the first time, and after that only stacks and renews the copy, so nothing is allocated.
+
+    Attributes:
+    ----------
+    id: str
+        The ID of the buff, unique among the buffs (or debuffs) of a unit
+    type: str
+        The stat it changes, or "DoT", "Heal", "Crowd Control", etc.
+    dmg_type: str
+        The damage type for the stats with a damage type, e.g. "Fire" or "All" for DMG Boost
+    value_type: str
+        "Flat" or "Percentage" (of the source's stat)
+    value: float
+        The value of one stack
+    source: Unit
+        The unit that applied it
+    source_stats: str
+        The stat of the source for the percentage value
+    max_stack: int
+        The max number of stacks
+    stack: int
+        The number of stacks (added to the existing stacks when renewing)
+    decay: str
+        The phase at which its turns run down ("Start", "End") or None if it never decays
+    turn: int
+        The number of turns left
+    unlock: str
+        The phase that unlocks it ("Start", "End", "Action") or None
+    locked: bool
+        Whether its turns can't run down yet
+    prototype: bool
+        Whether it is a prototype, which is copied instead of being added itself
+    """
+    __slots__ = (
+        "id", "type", "dmg_type", "value_type", "value", "source", "source_stats", "max_stack", "stack", "decay",
+        "turn", "unlock", "locked", "prototype"
+    )
+
+    def __init__(
+            self, id, type, dmg_type, value_type, value, source, source_stats, max_stack, stack, decay, turn, unlock,
+            locked, prototype=False
+    ):
+        self.id = id
+        self.type = type
+        self.dmg_type = dmg_type
+        self.value_type = value_type
+        self.value = value
+        self.source = source
+        self.source_stats = source_stats
+        self.max_stack = max_stack
+        self.stack = stack
+        self.decay = decay
+        self.turn = turn
+        self.unlock = unlock
+        self.locked = locked
+        self.prototype = prototype
+
+    @classmethod
+    def from_dict(cls, buff):
+        """
+        Makes a Buff from a buff dictionary.
+
+        Parameters:
+        ----------
+        buff: dict
+            The buff in the dictionary form, see Unit.add_buff(.)
+
+        Returns:
+        -------
+        The Buff
+        """
+        return cls(*[buff[key] for key in BUFF_FIELDS])
+
+    def copy(self):
+        """
+        Returns:
+        -------
+        A copy of the buff that isn't a prototype
+        """
+        return Buff(
+            self.id, self.type, self.dmg_type, self.value_type, self.value, self.source, self.source_stats,
+            self.max_stack, self.stack, self.decay, self.turn, self.unlock, self.locked
+        )
+
+    def get(self, key, default=None):
+        attribute = BUFF_FIELDS.get(key)
+        if attribute is None:
+            return default
+        return getattr(self, attribute)
+
+    def __getitem__(self, key):
+        return getattr(self, BUFF_FIELDS[key])
+
+    def __setitem__(self, key, value):
+        setattr(self, BUFF_FIELDS[key], value)
+
+    def __repr__(self):
+        return "Buff(" + repr({key: getattr(self, BUFF_FIELDS[key]) for key in BUFF_FIELDS}) + ")"
+
+
+def intern_buff(id, type, dmg_type, value_type, value, source, source_stats, max_stack, stack, decay, turn, unlock,
+                locked):
+    """
+    Finds the prototype with these fields, or makes one.\n
+    Effects that add the same buff over and over (e.g. a stack on every hit) should make their prototype once and add
+    it every time. Prototypes with the same fields are shared. The ones whose source is a unit are kept as long as the
+    program runs, so units that make many of them should keep their own prototype instead, e.g. with
+    Buff(..., prototype=True) in __init__.
+
+    Returns:
+    -------
+    The prototype
+    """
+    key = (id, type, dmg_type, value_type, value, source, source_stats, max_stack, stack, decay, turn, unlock, locked)
+    prototype = BUFF_PROTOTYPES.get(key)
+    if prototype is None:
+        prototype = Buff(*key, prototype=True)
+        BUFF_PROTOTYPES[key] = prototype
+    return prototype
@@ -0,0 +1,143 @@
+# the types of buffs/debuffs that do something at the start of every turn (see Unit.start_turn)
+TURN_START_TYPES = ("Heal", "DoT", "Crowd Control")
+
+
+class BuffStore:
+    """
+    The buffs (or debuffs) on a unit, indexed by ID and bucketed by the phase they unlock and decay at.\n
+    It is used like the list it replaces: iterating it gives the buffs in the order they were added, and a buff that
+    is renewed keeps its place. The lifecycle steps of a unit (unlocking, decaying, ticking at turn start) only look at
+    their own bucket instead of every buff.\n
+    A buff's unlock, decay, locked and type are read when it is added. After changing them on a buff that is
+    already in the store, add it again to update the buckets.
+
+    Attributes:
+    ----------
+    by_id: dict
+        The buffs by ID in the order they were added
+    locked: dict
+        The locked buffs by ID, grouped by the phase that unlocks them ("Start", "End", "Action", etc.)
+    decaying: dict
+        The buffs by ID, grouped by the phase at which their turns run down
+    ticking: dict
+        The buffs by ID whose type does something at the start of every turn (see TURN_START_TYPES)
+    """
+
+    def __init__(self, buffs=()):
+        """
+        Parameters:
+        ----------
+        buffs: iterable
+            The buffs the store starts with
+        """
+        self.by_id = {}
+        self.locked = {}
+        self.decaying = {}
+        self.ticking = {}
+        for buff in buffs:
+            self.add(buff)
+
+    def get(self, buff_id):
+        """
+        Parameters:
+        ----------
+        buff_id: str
+            The ID of the buff
+
+        Returns:
+        -------
+        The buff with that ID, or None if there isn't one
+        """
+        return self.by_id.get(buff_id)
+
+    def add(self, buff):
+        """
+        Adds a buff, or updates the buckets of a buff that is already in the store after it has been renewed.
+
+        Parameters:
+        ----------
+        buff: Buff
+            The buff to be added
+        """
+        buff_id = buff.id
+        self.by_id[buff_id] = buff
+        if buff.locked:
+            if buff.unlock in self.locked:
+                self.locked[buff.unlock][buff_id] = buff
+            else:
+                self.locked[buff.unlock] = {buff_id: buff}
+        if buff.decay in self.decaying:
+            self.decaying[buff.decay][buff_id] = buff
+        else:
+            self.decaying[buff.decay] = {buff_id: buff}
+        if buff.type in TURN_START_TYPES:
+            self.ticking[buff_id] = buff
+
+    def remove(self, buff):
+        """
+        Removes a buff.
+
+        Parameters:
+        ----------
+        buff: Buff
+            The buff to be removed, or another buff with the same ID
+
+        Returns:
+        -------
+        The buff that was removed
+        """
+        buff_id = buff["ID"]
+        buff = self.by_id.pop(buff_id, None)
+        if buff is None:
+            raise ValueError(str(buff_id) + " is not in the store")
+        if buff.unlock in self.locked:
+            self.locked[buff.unlock].pop(buff_id, None)
+        self.decaying[buff.decay].pop(buff_id, None)
+        self.ticking.pop(buff_id, None)
+        return buff
+
+    def unlock(self, phase):
+        """
+        Unlocks the buffs that unlock at a phase.
+
+        Parameters:
+        ----------
+        phase: str
+            The phase, e.g. "Start"
+        """
+        locked = self.locked.get(phase)
+        if locked:
+            for buff in locked.values():
+                buff.locked = False
+            locked.clear()
+
+    def decaying_at(self, phase):
+        """
+        Parameters:
+        ----------
+        phase: str
+            The phase, e.g. "End"
+
+        Returns:
+        -------
+        A list of the buffs whose turns run down at the phase, in the order they were added
+        """
+        decaying = self.decaying.get(phase)
+        if not decaying:
+            return []
+        return list(decaying.values())
+
+    def __iter__(self):
+        return iter(self.by_id.values())
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __contains__(self, buff):
+        """
+        Checks if there is a buff with the same ID in the store.
+        """
+        return buff["ID"] in self.by_id
+
+    def __repr__(self):
+        return repr(list(self.by_id.values()))
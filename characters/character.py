@@ -19,12 +19,16 @@ class Character(Unit):
         }
         super(Character, self).__init__(*args, **kwargs)
 
-    def refresh_runtime_stats(self):
-        super(Character, self).refresh_runtime_stats()
-        self.runtime_stats["HP"] += self.extra_stats["HP"] + self.extra_stats["HP Percentage"] * self.stats["HP"]
-        self.runtime_stats["ATK"] += self.extra_stats["ATK"] + self.extra_stats["ATK Percentage"] * self.stats["ATK"]
-        self.runtime_stats["DEF"] += self.extra_stats["DEF"] + self.extra_stats["DEF Percentage"] * self.stats["DEF"]
-        self.runtime_stats["SPD"] += self.extra_stats["SPD"] + self.extra_stats["SPD Percentage"] * self.stats["SPD"]
+    def rebuild_runtime_stats(self):
+        super(Character, self).rebuild_runtime_stats()
+        array = self.runtime_stats.array
+        stats = self.stats.array
+        extra_stats = self.extra_stats
+        array[Stat.HP] += extra_stats["HP"] + extra_stats["HP Percentage"] * stats[Stat.HP]
+        array[Stat.ATK] += extra_stats["ATK"] + extra_stats["ATK Percentage"] * stats[Stat.ATK]
+        array[Stat.DEF] += extra_stats["DEF"] + extra_stats["DEF Percentage"] * stats[Stat.DEF]
+        array[Stat.SPD] += extra_stats["SPD"] + extra_stats["SPD Percentage"] * stats[Stat.SPD]
+        self.runtime_stats.touch()
 
     @abstractmethod
     def try_activate_ult(self, enemies, players):
@@ -120,20 +124,7 @@ class Dummy(Character):
         )
 
     def choose_action(self, enemies, players, sp):
-        for enemy in enemies:
-            enemy.refresh_runtime_stats()
-        taunts = [enemy.runtime_stats["Taunt"] for enemy in enemies]
-        sigma = sum(taunts)
-        for i in range(len(taunts)):
-            taunts[i] /= sigma
-        rand = random()
-        cdf = 0
-        target = None
-        for i in range(len(taunts)):
-            cdf += taunts[i]
-            if rand <= cdf:
-                target = enemies[i]
-                break
+        target = choose_target(enemies, self.rng)
         return "Basic ATK", self.decorated_self, (target,)
 
     def try_activate_ult(self, enemies, players):
@@ -143,7 +134,7 @@ class Dummy(Character):
         commands = []
         dmg = 1 * self.runtime_stats["ATK"]
         break_dmg = 30
-        tags = ("Basic ATK", self.dmg_type)
+        tags = intern_tags("Basic ATK", self.dmg_type)
         data = ((targets[0], (dmg, break_dmg), tags),)
         commands.append(("Start ATK", self.decorated_self, targets))
         commands.append(("Gain SP", self.decorated_self, 1))
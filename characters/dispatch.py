@@ -0,0 +1,207 @@
+from types import FunctionType, MethodType
+
+# the names of the methods each decorator class only forwards
+FORWARDED_NAMES = {}
+
+
+class Dispatch:
+    """
+    The methods of a decorated unit from some layer down, each bound to the first layer that really overrides it.\n
+    A flattened unit's decorators point at a Dispatch instead of the layer below (see flatten_decorators(.)). The
+    methods are instance attributes, so calling one costs an attribute lookup and no forwarding calls. Everything
+    else is looked up on the layer.
+
+    Attributes:
+    ----------
+    layer: Unit
+        The layer the dispatch stands in for
+    """
+
+    def __init__(self, layer):
+        self.layer = layer
+
+    def __getattr__(self, name):
+        # the methods no decorator forwards (e.g. invalidate_runtime_stats) and the attributes
+        return getattr(self.layer, name)
+
+
+def forwarder(function):
+    """
+    Marks a method of a decorator that only passes the call on, i.e. its body is
+    return self.__decorated_character.name(args) with its own arguments in order.\n
+    Flattening skips the marked methods (see flatten_decorators(.)), a method that isn't marked is always called. The
+    mark is checked when the class is defined, the method must call the method of the same name on the layer below
+    and nothing else.
+
+    Parameters:
+    ----------
+    function: function
+        The method
+
+    Returns:
+    -------
+    The method
+    """
+    names = function.__code__.co_names
+    if len(names) != 2 or not names[0].endswith("__decorated_character") or names[1] != function.__name__:
+        raise TypeError(function.__qualname__ + " is marked as a forwarder but doesn't only pass the call on")
+    function.forwards = True
+    return function
+
+
+def is_forwarder(function):
+    """
+    Returns:
+    -------
+    True if the method is marked with forwarder(.)
+    """
+    return getattr(function, "forwards", False)
+
+
+def forwarded_names(decorator_class):
+    """
+    Returns:
+    -------
+    The set of the names of the methods a decorator class only forwards
+    """
+    names = FORWARDED_NAMES.get(decorator_class)
+    if names is None:
+        names = set()
+        for name in dir(decorator_class):
+            function = getattr(decorator_class, name, None)
+            if isinstance(function, FunctionType) and is_forwarder(function):
+                names.add(name)
+        FORWARDED_NAMES[decorator_class] = names
+    return names
+
+
+def decorator_chain(unit):
+    """
+    Lists the layers of a decorated unit.
+
+    Parameters:
+    ----------
+    unit: Unit
+        Any layer of the unit
+
+    Returns:
+    -------
+    A list of (layer, name of the attribute pointing at the layer below) from the outermost layer to the character
+    itself, whose attribute name is None
+    """
+    chain = []
+    layer = unit.decorated_self
+    while layer is not None:
+        pointer = "_" + layer.__class__.__name__ + "__decorated_character"
+        below = layer.__dict__.get(pointer)
+        chain.append((layer, pointer if below is not None else None))
+        layer = below
+    return chain
+
+
+def find_override(chain, start, name):
+    """
+    Returns:
+    -------
+    The method name of the first layer from chain[start] down that doesn't just forward it, bound to that layer, or
+    None if no layer has it
+    """
+    for layer, pointer in chain[start:]:
+        function = getattr(layer.__class__, name, None)
+        if not isinstance(function, FunctionType):
+            return None
+        if pointer is None or not is_forwarder(function):
+            return MethodType(function, layer)
+    return None
+
+
+def resolve_method(unit, name):
+    """
+    Finds the method that really runs when a method is called on a unit, skipping the layers that only forward it.
+
+    Parameters:
+    ----------
+    unit: Unit
+        Any layer of the unit, flattened or not
+    name: str
+        The name of the method
+
+    Returns:
+    -------
+    The function of the method, e.g. Unit.crit_dmg if no layer overrides it, or None if no layer has it
+    """
+    dispatch = unit.__dict__.get("flat_dispatch")
+    if dispatch is not None:
+        method = dispatch.__dict__.get(name)
+        if method is not None:
+            return method.__func__
+        # no decorator forwards it, so it is the outermost layer's
+        function = getattr(unit.decorated_self.__class__, name, None)
+        return function if isinstance(function, FunctionType) else None
+    method = find_override(decorator_chain(unit), 0, name)
+    return method.__func__ if method is not None else None
+
+
+def flatten_decorators(unit):
+    """
+    Collapses the decorators of a unit (light cones, relics) so that calls skip the layers that only forward them.\n
+    Every decorator has to forward each method to the layer below by hand, so a character with a light cone and two
+    relic sets pays three extra calls on every hook. The forwarding methods are the ones marked with forwarder(.).
+    After flattening, each method is looked up once: calling it on the unit goes straight to the outermost layer that
+    really overrides it, and inside that override, the call to the layer below goes straight to the next real
+    override.\n
+    Calling a method on any layer runs it from the outermost layer down, like self.decorated_self.foo(.). Undo it with
+    unflatten_decorators(.) before adding another decorator. The operating system flattens the units when the battle
+    is set up and undoes it when the battle ends.
+
+    Parameters:
+    ----------
+    unit: Unit
+        Any layer of the unit
+    """
+    state = unit.__dict__
+    if "flat_dispatch" in state:
+        return
+    chain = decorator_chain(unit)
+    if len(chain) == 1:
+        return
+    names = set()
+    for layer, pointer in chain[:-1]:
+        names.update(forwarded_names(layer.__class__))
+    dispatches = []
+    for index in range(len(chain)):
+        dispatch = Dispatch(chain[index][0])
+        for name in names:
+            method = find_override(chain, index, name)
+            if method is not None:
+                setattr(dispatch, name, method)
+        dispatches.append(dispatch)
+    # the layer above each dispatch points at it
+    for index in range(1, len(chain)):
+        state[chain[index - 1][1]] = dispatches[index]
+    # calls on the unit itself find the methods in the shared dictionary before the class
+    for name in names:
+        if name in dispatches[0].__dict__:
+            state[name] = dispatches[0].__dict__[name]
+    state["flat_dispatch"] = dispatches[0]
+
+
+def unflatten_decorators(unit):
+    """
+    Puts back the decorators of a unit flattened by flatten_decorators(.).
+
+    Parameters:
+    ----------
+    unit: Unit
+        Any layer of the unit
+    """
+    state = unit.__dict__
+    dispatch = state.pop("flat_dispatch", None)
+    if dispatch is None:
+        return
+    for name in dispatch.__dict__:
+        if name != "layer":
+            state.pop(name, None)
+    for key in list(state):
+        if type(state[key]) is Dispatch:
+            state[key] = state[key].layer
@@ -13,36 +13,6 @@ WEAKNESS_BREAK_DEBUFF_NAMES = {
 }
 
 
-def choose_target(players):
-    """
-    Randomly choose a player character based on their Taunt stats
-
-    Parameters:
-    ----------
-    players: tuple
-        The tuple of player units
-
-    Returns:
-    -------
-    The selected target
-    """
-    for char in players:
-        char.refresh_runtime_stats()
-    taunts = [char.runtime_stats["Taunt"] for char in players]
-    sigma = sum(taunts)
-    for i in range(len(taunts)):
-        taunts[i] /= sigma
-    rand = random()
-    cdf = 0
-    target = None
-    for i in range(len(taunts)):
-        cdf += taunts[i]
-        if rand <= cdf:
-            target = players[i]
-            break
-    return target
-
-
 class Enemy(Unit):
 
     def __init__(
@@ -123,8 +93,23 @@ class Enemy(Unit):
         if self.weakness_beak_debuff_dmg["Physical"] > bleed_dmg_cap:
             self.weakness_beak_debuff_dmg["Physical"] = bleed_dmg_cap
 
+    def choose_target(self, players):
+        """
+        Randomly choose a player character based on their Taunt stats
+
+        Parameters:
+        ----------
+        players: tuple
+            The tuple of player units
+
+        Returns:
+        -------
+        The selected target, or None if there are no player units
+        """
+        return choose_target(players, self.rng)
+
     def choose_action(self, enemies, players, sp):
-        target = choose_target(players)
+        target = self.decorated_self.choose_target(players)
         return "Basic ATK", self.decorated_self, (target,)
 
     def weakness_break(self, dmg_type, source, enemies, players):
@@ -149,7 +134,7 @@ class Enemy(Unit):
         commands = []
         # weakness break base damage
         dmg = self.weakness_beak_base_dmg[dmg_type]
-        tags = ("Break", dmg_type)
+        tags = intern_tags("Break", dmg_type)
         data = ((self.decorated_self, (dmg, 0), tags),)
         commands.append(("DMG", source, data))
         dmg = self.weakness_beak_debuff_dmg[dmg_type]
@@ -168,21 +153,21 @@ class Enemy(Unit):
             else:
                 max_stack = 1
                 stack = 1
-            debuff = {
-                "ID": debuff_id,
-                "Type": "DoT",
-                "DMG Type": dmg_type,
-                "Value Type": "Flat",
-                "Value": dmg,
-                "Source": source,
-                "Source Stats": None,
-                "Max Stack": max_stack,
-                "Stack": stack,
-                "Decay": "Start",
-                "Turn": 2,
-                "Unlock": "Start",
-                "Locked": True
-            }
+            debuff = Buff(
+                id=debuff_id,
+                type="DoT",
+                dmg_type=dmg_type,
+                value_type="Flat",
+                value=dmg,
+                source=source,
+                source_stats=None,
+                max_stack=max_stack,
+                stack=stack,
+                decay="Start",
+                turn=2,
+                unlock="Start",
+                locked=True
+            )
         else:
             # weakness break action delay and debuff
             debuff_id = WEAKNESS_BREAK_DEBUFF_NAMES[dmg_type]
@@ -201,21 +186,21 @@ class Enemy(Unit):
                 max_stack = 1
                 data = ((self.decorated_self, 0.25),)
             commands.append(("Delay", source, data))
-            debuff = {
-                "ID": debuff_id,
-                "Type": "Crowd Control",
-                "DMG Type": dmg_type,
-                "Value Type": "Flat",
-                "Value": value,
-                "Source": source,
-                "Source Stats": None,
-                "Max Stack": max_stack,
-                "Stack": 1,
-                "Decay": "Start",
-                "Turn": 1,
-                "Unlock": "Start",
-                "Locked": True
-            }
+            debuff = Buff(
+                id=debuff_id,
+                type="Crowd Control",
+                dmg_type=dmg_type,
+                value_type="Flat",
+                value=value,
+                source=source,
+                source_stats=None,
+                max_stack=max_stack,
+                stack=1,
+                decay="Start",
+                turn=1,
+                unlock="Start",
+                locked=True
+            )
         data = ((self.decorated_self, 1.5, debuff),)
         commands.append(("Debuff", source, data))
         return tuple(commands)
@@ -223,7 +208,7 @@ class Enemy(Unit):
     def basic_atk(self, targets, step):
         commands = []
         dmg = 1 * self.runtime_stats["ATK"]
-        tags = ("Basic ATK", self.dmg_type)
+        tags = intern_tags("Basic ATK", self.dmg_type)
         data = ((targets[0], (dmg, 0), tags),)
         commands.append(("Start ATK", self.decorated_self, targets))
         commands.append(("DMG", self.decorated_self, data))
@@ -257,7 +242,7 @@ class Boss(Enemy):
         data = []
         for target in targets:
             dmg = 0.5 * self.runtime_stats["ATK"]
-            tags = ("Skill", self.dmg_type)
+            tags = intern_tags("Skill", self.dmg_type)
             data.append((target, (dmg, 0), tags))
         data = tuple(data)
         commands.append(("Start ATK", self.decorated_self, targets))
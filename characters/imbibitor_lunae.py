@@ -1,6 +1,13 @@
 from characters.character import *
 
 
+def target_weak_to_imaginary(unit, target, tags):
+    """
+    The condition of Imbibitor Lunae's CRIT DMG bonus.
+    """
+    return "Imaginary" in target.weaknesses
+
+
 class ImbibitorLunae(Character):
 
     def __init__(self):
@@ -33,6 +40,43 @@ class ImbibitorLunae(Character):
         )
 
         self.energy = self.max_energy / 2 + 15
+        # more CRIT DMG against enemies weak to Imaginary
+        self.add_conditional_modifier(
+            ConditionalModifier("CRIT DMG", None, 0.24, predicate=target_weak_to_imaginary)
+        )
+        # the buffs are added many times per battle, they are prototypes so only the first time makes a new buff
+        self.skill_buff = Buff(
+            id="Outroar",
+            type="CRIT DMG",
+            dmg_type=None,
+            value_type="Flat",
+            value=0.12,
+            source=None,
+            source_stats=None,
+            max_stack=4,
+            stack=1,
+            decay="End",
+            turn=1,
+            unlock="End",
+            locked=True,
+            prototype=True
+        )
+        self.talent_buff = Buff(
+            id="Righteous Heart",
+            type="DMG Boost",
+            dmg_type="All",
+            value_type="Flat",
+            value=0.1,
+            source=None,
+            source_stats=None,
+            max_stack=6,
+            stack=1,
+            decay="End",
+            turn=1,
+            unlock="End",
+            locked=True,
+            prototype=True
+        )
         self.extra_stats["HP Percentage"] += 0.1
         self.basic_attack_enhancement_level = 0
         self.squama_sacrosancta = 0
@@ -74,7 +118,7 @@ class ImbibitorLunae(Character):
         atk = self.runtime_stats["ATK"]
         energy_regen = self.runtime_stats["Energy Regeneration Rate"]
         if self.basic_attack_enhancement_level == 0:
-            tags = ("Basic ATK", self.dmg_type)
+            tags = intern_tags("Basic ATK", self.dmg_type)
             done = step >= 2
             if step == 1:
                 commands.append(("Start ATK", self.decorated_self, targets))
@@ -84,7 +128,7 @@ class ImbibitorLunae(Character):
             data = ((targets[0], dmg_break, tags),)
             commands.append(("DMG", self.decorated_self, data))
         else:
-            tags = ("Basic ATK", "Enhanced", self.dmg_type)
+            tags = intern_tags("Basic ATK", "Enhanced", self.dmg_type)
             if step == 1:
                 commands.append(("Start ATK", self.decorated_self, targets))
                 sp_consumption = 0
@@ -132,22 +176,9 @@ class ImbibitorLunae(Character):
         # Imbibitor doesn't really have a skill that count as an action
         # this is only for internal usage for adding buffs
         if step >= 4:
-            skill_buff = {
-                "ID": "Outroar",
-                "Type": "CRIT DMG",
-                "DMG Type": None,
-                "Value": 0.12,
-                "Value Type": "Flat",
-                "Source": self.decorated_self,
-                "Source Stats": None,
-                "Max Stack": 4,
-                "Stack": 1,
-                "Decay": "End",
-                "Turn": 1,
-                "Unlock": "End",
-                "Locked": True
-            }
-            self.decorated_self.add_buff(skill_buff)
+            # decorators are added after __init__, so the source is only known now
+            self.skill_buff.source = self.decorated_self
+            self.decorated_self.add_buff(self.skill_buff)
 
     def ultimate(self, targets, step):
         commands = []
@@ -158,7 +189,7 @@ class ImbibitorLunae(Character):
             self.squama_sacrosancta += 2
             if self.squama_sacrosancta > 3:
                 self.squama_sacrosancta = 3
-        tags = ("Ultimate", self.dmg_type)
+        tags = intern_tags("Ultimate", self.dmg_type)
         atk = self.runtime_stats["ATK"]
         dmg_break1 = (3 * atk / 3, 60 / 3)
         dmg_break2 = (1.4 * atk / 3, 60 / 3)
@@ -177,29 +208,6 @@ class ImbibitorLunae(Character):
         return tuple()
 
     def end_dmg(self, data, enemies, players):
-        talent_buff = {
-            "ID": "Righteous Heart",
-            "Type": "DMG Boost",
-            "DMG Type": "All",
-            "Value": 0.1,
-            "Value Type": "Flat",
-            "Source": self.decorated_self,
-            "Source Stats": None,
-            "Max Stack": 6,
-            "Stack": 1,
-            "Decay": "End",
-            "Turn": 1,
-            "Unlock": "End",
-            "Locked": True
-        }
-        self.decorated_self.add_buff(talent_buff)
+        self.talent_buff.source = self.decorated_self
+        self.decorated_self.add_buff(self.talent_buff)
         return tuple()
-
-    def crit_dmg(self, dmg_and_break, target, tags, enemies, players, expected=True):
-        activate = "Imaginary" in target.weaknesses
-        if activate:
-            self.runtime_stats["CRIT DMG"] += 0.24
-        result = super(ImbibitorLunae, self).crit_dmg(dmg_and_break, target, tags, enemies, players, expected)
-        if activate:
-            self.runtime_stats["CRIT DMG"] -= 0.24
-        return result
@@ -0,0 +1,91 @@
+from characters.stat_vector import *
+from characters.tags import *
+
+# the stats a conditional modifier can change and the step of the damage process that reads them
+MODIFIER_TYPES = ("DMG Boost", "CRIT Rate", "CRIT DMG")
+
+
+class ConditionalModifier:
+    """
+    A stat bonus that only applies to the hits that meet its conditions, e.g. the 15% DMG Boost of Salsotto for
+    ultimates and follow-up attacks while CRIT Rate is at least 50%.\n
+    Add it to a unit with Unit.add_conditional_modifier(.). The damage process checks the conditions of every hit and
+    adds the bonus to the stat it reads (DMG Boost in amend_outgoing_dmg(.), CRIT Rate and CRIT DMG in crit_dmg(.)),
+    so the unit's stats are never changed and nothing has to be rebuilt.
+
+    Attributes:
+    ----------
+    type: str
+        The stat it changes, one of MODIFIER_TYPES
+    dmg_type: str
+        For DMG Boost, the damage type or tag it boosts ("All", "Fire", "Ultimate", etc.)
+    value: float
+        The bonus
+    tags: tuple
+        It only applies to the hits with at least one of these tags, None for all hits
+    dmg_type_flag: int
+        The bit of dmg_type for DMG Boost other than "All", 0 otherwise (see tags.py)
+    tags_flags: int
+        The bits of tags, None for all hits
+    min_stats: tuple
+        It only applies while the unit's runtime stats are at least these values, (offset, value) pairs
+    predicate: function
+        Any other condition, predicate(unit, target, tags) returns True if it applies, or None
+    """
+
+    def __init__(self, type, dmg_type, value, tags=None, min_stats=None, predicate=None):
+        """
+        Parameters:
+        ----------
+        type: str
+            The stat it changes, one of MODIFIER_TYPES
+        dmg_type: str
+            For DMG Boost, the damage type or tag it boosts ("All", "Fire", "Ultimate", etc.), None otherwise
+        value: float
+            The bonus
+        tags: tuple
+            It only applies to the hits with at least one of these tags, None for all hits
+        min_stats: dict
+            It only applies while the unit's runtime stats are at least these values, e.g. {"CRIT Rate": 0.5}
+        predicate: function
+            Any other condition, predicate(unit, target, tags) returns True if it applies
+        """
+        if type not in MODIFIER_TYPES:
+            raise ValueError(type + " can't be changed by a conditional modifier")
+        self.type = type
+        self.dmg_type = dmg_type
+        self.value = value
+        self.tags = tags
+        self.dmg_type_flag = tag_flag(dmg_type) if type == "DMG Boost" and dmg_type != "All" else 0
+        self.tags_flags = tag_mask(tags) if tags is not None else None
+        self.min_stats = tuple([(STAT_OFFSETS[stat], min_stats[stat]) for stat in min_stats]) if min_stats else ()
+        self.predicate = predicate
+
+    def applies(self, unit, target, tags):
+        """
+        Checks the conditions for a hit.
+
+        Parameters:
+        ----------
+        unit: Unit
+            The unit dealing the damage
+        target: Unit
+            The target of the damage
+        tags: Tags
+            The tags of the damage
+
+        Returns:
+        -------
+        True if the bonus applies to the hit
+        """
+        flags = tags.flags
+        if self.dmg_type_flag and not flags & self.dmg_type_flag:
+            return False
+        if self.tags_flags is not None and not flags & self.tags_flags:
+            return False
+        if self.min_stats:
+            array = unit.runtime_stats.array
+            for offset, value in self.min_stats:
+                if array[offset] < value:
+                    return False
+        return self.predicate is None or self.predicate(unit, target, tags)
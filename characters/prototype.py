@@ -0,0 +1,113 @@
+from random import Random
+from characters.unit import *
+from characters.dispatch import *
+
+
+class Prototype:
+    """
+    A template used to stamp out copies of a unit without building it again.\n
+    Building a character means running the constructors of the character and all its decorators, each of which
+    refreshes the runtime stats. A prototype takes a snapshot of the unit once and each clone(.) only copies that
+    snapshot. All the decorators of a unit share one __dict__ (see light_cone.py), so the snapshot is that dictionary.
+    The decorator objects themselves (the layers) hold nothing but the shared dictionary, so a clone gets a new object
+    of the same class for every layer, and every reference to a layer in the snapshot (decorated_self and the
+    name-mangled __decorated_character attributes) is pointed at the new layers.\n
+    Make the prototype right after building the unit. Every clone starts in the state the unit was in at that moment,
+    i.e. with full HP, the initial energy, no buffs/debuffs and empty damage records, and clones share nothing with
+    each other or with the template.
+
+    Attributes:
+    ----------
+    unit: Unit
+        The template (the outermost decorator)
+    layers: list
+        The template's character object and all its decorators
+    snapshot: dict
+        A copy of the template's attributes
+    """
+
+    def __init__(self, unit):
+        """
+        Parameters:
+        ----------
+        unit: Unit
+            A freshly built unit, usually a fully decorated character
+        """
+        self.unit = unit.decorated_self
+        state = self.unit.__dict__
+        # the layers are found through the attributes that point at them, so put the decorators back first
+        flattened = "flat_dispatch" in state
+        unflatten_decorators(self.unit)
+        if type(state["runtime_stats"]) is OutdatedRuntimeStats:
+            state["runtime_stats"].current()
+        # every layer is referenced from the shared dictionary, by decorated_self or by the layer outside it
+        self.layers = [self.unit]
+        for value in state.values():
+            if isinstance(value, Unit) and value.__dict__ is state and value not in self.layers:
+                self.layers.append(value)
+        # the snapshot still points at the template's layers, they are replaced when cloning
+        self.snapshot = copy_state(state, {})
+        if flattened:
+            flatten_decorators(self.unit)
+
+    def clone(self):
+        """
+        Makes a new copy of the template.
+
+        Returns:
+        -------
+        The outermost decorator of the copy
+        """
+        state = {}
+        new_layers = {}
+        for layer in self.layers:
+            # skip __init__, all the attributes come from the snapshot
+            new_layer = layer.__class__.__new__(layer.__class__)
+            new_layer.__dict__ = state
+            new_layers[id(layer)] = new_layer
+        state.update(copy_state(self.snapshot, new_layers))
+        return new_layers[id(self.unit)]
+
+
+def copy_state(value, layers):
+    """
+    Copies the containers (dict, list, set, tuple, StatVector, Buff, BuffStore, TauntTable) in an attribute value so
+    that the copy shares nothing mutable.
+
+    Parameters:
+    ----------
+    value: Any
+        The value to be copied
+    layers: dict
+        Maps the id of each template layer to the layer that replaces it
+
+    Returns:
+    -------
+    The copy
+    """
+    value_type = value.__class__
+    if value_type is dict:
+        return {key: copy_state(value[key], layers) for key in value}
+    if value_type is list:
+        return [copy_state(item, layers) for item in value]
+    if value_type is set:
+        return {copy_state(item, layers) for item in value}
+    if value_type is tuple:
+        return tuple([copy_state(item, layers) for item in value])
+    if value_type is Buff:
+        buff = value.copy()
+        buff.source = layers.get(id(buff.source), buff.source)
+        buff.prototype = value.prototype
+        return buff
+    if value_type is BuffStore:
+        return BuffStore([copy_state(buff, layers) for buff in value])
+    if value_type is StatVector:
+        return value.copy()
+    if value_type is TauntTable:
+        # the clone is on its own until it joins the table of its side
+        return TauntTable()
+    if value_type is Random:
+        # the operating system hands the battle's generator to every unit anyway
+        return Random()
+    # other units (e.g. the source of a buff) are kept as they are, only the template's own layers are replaced
+    return layers.get(id(value), value)
@@ -0,0 +1,279 @@
+from array import array
+from collections.abc import MutableMapping
+from itertools import count
+
+ELEMENTS = ("Physical", "Fire", "Ice", "Lightning", "Wind", "Quantum", "Imaginary")
+
+
+class Stat:
+    """
+    The offsets of the stats in a StatVector.\n
+    The scalar stats come first, then the blocks of stats that have an entry for each damage type. The offset of a
+    block is the offset of its first entry, e.g. Stat.DMG_BOOST + 1 is the Physical DMG Boost. Use BLOCK_OFFSETS to
+    find the entry of a damage type or a tag.
+    """
+    TAUNT = 0
+    HP = 1
+    ATK = 2
+    DEF = 3
+    SPD = 4
+    CRIT_RATE = 5
+    CRIT_DMG = 6
+    BREAK_EFFECT = 7
+    OUTGOING_HEALING_BOOST = 8
+    INCOMING_HEALING_BOOST = 9
+    ENERGY_REGENERATION_RATE = 10
+    EFFECT_HIT_RATE = 11
+    EFFECT_RES = 12
+    CROWD_CONTROL_RES = 13
+    DMG_TAKEN_DECREASE = 14
+    DEF_IGNORE = 15
+    WEAKEN = 16
+    # All, Physical, Fire, Ice, Lightning, Wind, Quantum, Imaginary
+    DMG_BOOST = 17
+    # Physical, Fire, Ice, Lightning, Wind, Quantum, Imaginary
+    RES_BOOST = 25
+    # All
+    DMG_TAKEN_INCREASE = 32
+    # Physical, Fire, Ice, Lightning, Wind, Quantum, Imaginary
+    RES_PEN = 33
+    # the size of the fixed layout, the entries added later (e.g. the DMG Boost of "Basic ATK") go after it
+    FIXED_SIZE = 40
+
+
+# the offset of each scalar stat by name
+STAT_OFFSETS = {
+    "Taunt": Stat.TAUNT,
+    "HP": Stat.HP,
+    "ATK": Stat.ATK,
+    "DEF": Stat.DEF,
+    "SPD": Stat.SPD,
+    "CRIT Rate": Stat.CRIT_RATE,
+    "CRIT DMG": Stat.CRIT_DMG,
+    "Break Effect": Stat.BREAK_EFFECT,
+    "Outgoing Healing Boost": Stat.OUTGOING_HEALING_BOOST,
+    "Incoming Healing Boost": Stat.INCOMING_HEALING_BOOST,
+    "Energy Regeneration Rate": Stat.ENERGY_REGENERATION_RATE,
+    "Effect Hit Rate": Stat.EFFECT_HIT_RATE,
+    "Effect RES": Stat.EFFECT_RES,
+    "Crowd Control RES": Stat.CROWD_CONTROL_RES,
+    "DMG Taken Decrease": Stat.DMG_TAKEN_DECREASE,
+    "DEF Ignore": Stat.DEF_IGNORE,
+    "Weaken": Stat.WEAKEN
+}
+# the offset of each entry of each block by name
+BLOCK_OFFSETS = {
+    "DMG Boost": {key: Stat.DMG_BOOST + i for i, key in enumerate(("All",) + ELEMENTS)},
+    "RES Boost": {key: Stat.RES_BOOST + i for i, key in enumerate(ELEMENTS)},
+    "DMG Taken Increase": {"All": Stat.DMG_TAKEN_INCREASE},
+    "RES PEN": {key: Stat.RES_PEN + i for i, key in enumerate(ELEMENTS)}
+}
+# the (stats_type, key) pair of the entries added after the fixed layout
+EXTRA_ENTRIES = []
+# hands out the versions of the vectors, no two states of any two vectors share a version
+STAT_VERSIONS = count(1)
+
+
+def entry_offset(stats_type, key):
+    """
+    Finds the offset of an entry of a block, or adds the entry to the layout if it is new.\n
+    New entries are shared by all vectors, e.g. once someone has a "Basic ATK" DMG Boost, every vector has a slot for
+    it. A vector only counts the slot as its entry after the entry is set on it.
+
+    Parameters:
+    ----------
+    stats_type: str
+        The name of the block, e.g. "DMG Boost"
+    key: str
+        The damage type or tag, e.g. "Basic ATK"
+
+    Returns:
+    -------
+    The offset of the entry
+    """
+    offsets = BLOCK_OFFSETS[stats_type]
+    offset = offsets.get(key)
+    if offset is None:
+        offset = Stat.FIXED_SIZE + len(EXTRA_ENTRIES)
+        EXTRA_ENTRIES.append((stats_type, key))
+        offsets[key] = offset
+    return offset
+
+
+class StatVector(MutableMapping):
+    """
+    The stats of a unit stored in a flat array('d') with the layout in Stat.\n
+    Hot code reads and writes the array directly with the offsets, e.g. stats.array[Stat.ATK]. For everything else,
+    it behaves like the nested dictionary it replaces, e.g. stats["ATK"] or stats["DMG Boost"]["Fire"], and the
+    blocks can be given new entries like stats["DMG Boost"]["Basic ATK"] = 0.1.
+
+    Attributes:
+    ----------
+    array: array
+        The values of the stats
+    extra: set
+        The offsets of the entries added after the fixed layout that this vector has
+    blocks: dict
+        A dictionary-like view of each block
+    version: int
+        Changes every time the values change, so results computed from the values can be cached with it\n
+        The methods of the vector update it. Code that writes to the array directly has to call touch(.) after.
+    """
+
+    def __init__(self, stats=None):
+        """
+        Parameters:
+        ----------
+        stats: dict
+            The stats in the nested dictionary form, all zeros if it is None
+        """
+        self.array = array("d", bytes(8 * (Stat.FIXED_SIZE + len(EXTRA_ENTRIES))))
+        self.extra = set()
+        self.version = next(STAT_VERSIONS)
+        self.blocks = {stats_type: StatBlock(self, stats_type) for stats_type in BLOCK_OFFSETS}
+        if stats is not None:
+            for key in stats:
+                self[key] = stats[key]
+
+    def touch(self):
+        """
+        Gives the vector a new version after its array has been written to directly.
+        """
+        self.version = next(STAT_VERSIONS)
+
+    def grow(self):
+        """
+        Makes room for the entries added to the layout after this vector was made.
+        """
+        size = Stat.FIXED_SIZE + len(EXTRA_ENTRIES)
+        if len(self.array) < size:
+            self.array.extend(bytes(8 * (size - len(self.array))))
+
+    def copy(self):
+        """
+        Returns:
+        -------
+        A new vector with the same values
+        """
+        vector = StatVector()
+        vector.copy_from(self)
+        return vector
+
+    def copy_from(self, other):
+        """
+        Overwrites all the values with the values of another vector in one buffer copy.
+
+        Parameters:
+        ----------
+        other: StatVector
+            The vector to copy from
+        """
+        if len(self.array) != len(other.array):
+            self.grow()
+            other.grow()
+        self.array[:] = other.array
+        self.extra = set(other.extra)
+        self.version = next(STAT_VERSIONS)
+
+    def __getitem__(self, key):
+        offset = STAT_OFFSETS.get(key)
+        if offset is not None:
+            return self.array[offset]
+        return self.blocks[key]
+
+    def __setitem__(self, key, value):
+        offset = STAT_OFFSETS.get(key)
+        if offset is not None:
+            self.array[offset] = value
+            self.version = next(STAT_VERSIONS)
+        elif key in self.blocks:
+            block = self.blocks[key]
+            block.clear()
+            for sub_key in value:
+                block[sub_key] = value[sub_key]
+        else:
+            raise KeyError(key + " is not a stat")
+
+    def __delitem__(self, key):
+        raise TypeError("stats can't be removed")
+
+    def __contains__(self, key):
+        return key in STAT_OFFSETS or key in self.blocks
+
+    def __iter__(self):
+        yield from STAT_OFFSETS
+        yield from self.blocks
+
+    def __len__(self):
+        return len(STAT_OFFSETS) + len(self.blocks)
+
+    def __repr__(self):
+        return "StatVector(" + repr({key: self[key] for key in STAT_OFFSETS}) + ", " + repr(
+            {key: dict(self.blocks[key]) for key in self.blocks}) + ")"
+
+
+class StatBlock(MutableMapping):
+    """
+    A dictionary-like view of one block of a StatVector, e.g. the DMG Boost of each damage type.
+
+    Attributes:
+    ----------
+    vector: StatVector
+        The vector the block belongs to
+    stats_type: str
+        The name of the block
+    offsets: dict
+        The offset of each entry, the same dictionary as BLOCK_OFFSETS[stats_type]
+    """
+
+    def __init__(self, vector, stats_type):
+        self.vector = vector
+        self.stats_type = stats_type
+        self.offsets = BLOCK_OFFSETS[stats_type]
+
+    def __getitem__(self, key):
+        offset = self.offsets.get(key)
+        if offset is None or (offset >= Stat.FIXED_SIZE and offset not in self.vector.extra):
+            raise KeyError(key)
+        return self.vector.array[offset]
+
+    def __setitem__(self, key, value):
+        offset = entry_offset(self.stats_type, key)
+        if offset >= Stat.FIXED_SIZE:
+            self.vector.grow()
+            self.vector.extra.add(offset)
+        self.vector.array[offset] = value
+        self.vector.version = next(STAT_VERSIONS)
+
+    def __delitem__(self, key):
+        offset = self.offsets.get(key)
+        if offset is None or (offset >= Stat.FIXED_SIZE and offset not in self.vector.extra):
+            raise KeyError(key)
+        if offset < Stat.FIXED_SIZE:
+            raise TypeError(key + " is part of the fixed layout and can't be removed")
+        self.vector.array[offset] = 0
+        self.vector.version = next(STAT_VERSIONS)
+        self.vector.extra.discard(offset)
+
+    def clear(self):
+        for offset in self.offsets.values():
+            if offset < len(self.vector.array):
+                self.vector.array[offset] = 0
+            self.vector.extra.discard(offset)
+        self.vector.version = next(STAT_VERSIONS)
+
+    def __contains__(self, key):
+        offset = self.offsets.get(key)
+        return offset is not None and (offset < Stat.FIXED_SIZE or offset in self.vector.extra)
+
+    def __iter__(self):
+        extra = self.vector.extra
+        for key, offset in list(self.offsets.items()):
+            if offset < Stat.FIXED_SIZE or offset in extra:
+                yield key
+
+    def __len__(self):
+        return len(list(iter(self)))
+
+    def __repr__(self):
+        return repr(dict(self))
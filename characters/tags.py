@@ -0,0 +1,99 @@
+# the damage tags are interned like the event types (see events.py)
+# every tag name gets a bit, and every tuple of tags gets a small integer ID and the bits of its tags
+# so the damage process checks a tag with a bitwise and, e.g. tags.flags & DOT_FLAG
+# instead of scanning the tuple for a string
+
+# the bit of each tag name
+TAG_FLAGS = {}
+# the interned tuples of tags, the ID is the index
+TAG_SETS = []
+# the interned tuple of each tuple of tags
+TAG_IDS = {}
+
+
+def tag_flag(name):
+    """
+    Finds the bit of a tag name, or assigns a new bit if the name is new.
+
+    Parameters:
+    ----------
+    name: str
+        The tag name, e.g. "Follow-Up"
+
+    Returns:
+    -------
+    The bit of the tag
+    """
+    flag = TAG_FLAGS.get(name)
+    if flag is None:
+        flag = 1 << len(TAG_FLAGS)
+        TAG_FLAGS[name] = flag
+    return flag
+
+
+def tag_mask(names):
+    """
+    Returns:
+    -------
+    The bits of the tag names in an iterable, or'ed together
+    """
+    mask = 0
+    for name in names:
+        mask |= tag_flag(name)
+    return mask
+
+
+class Tags(tuple):
+    """
+    An interned tuple of the tags attached to a damage.\n
+    It is still a tuple, so tags[-1] is the damage type and "Skill" in tags works, but it also carries a small
+    integer ID and the bits of its tags. Make it with intern_tags(.), equal tuples of tags are the same object.
+
+    Attributes:
+    ----------
+    id: int
+        The ID of the tuple of tags, its index in TAG_SETS
+    flags: int
+        The bits of its tags (see tag_flag(.))
+    name: str
+        The tags joined by spaces, the key of the damage records, e.g. "Basic ATK Wind"
+    """
+
+    def __repr__(self):
+        return "Tags" + tuple.__repr__(self)
+
+
+def intern_tags(*tags):
+    """
+    Finds the interned tuple of some tags, or interns them if they are new.\n
+    Tags that never change can be interned once, e.g. in __init__. The operating system interns the tags of the DMG
+    commands that still use plain tuples.
+
+    Parameters:
+    ----------
+    tags: str
+        The tags, e.g. intern_tags("Basic ATK", "Wind")
+
+    Returns:
+    -------
+    The Tags
+    """
+    interned = TAG_IDS.get(tags)
+    if interned is None:
+        interned = Tags(tags)
+        interned.id = len(TAG_SETS)
+        interned.flags = tag_mask(tags)
+        interned.name = " ".join(tags)
+        TAG_SETS.append(interned)
+        TAG_IDS[tags] = interned
+    return interned
+
+
+# the tags the damage process checks
+BREAK_FLAG = tag_flag("Break")
+DOT_FLAG = tag_flag("DoT")
+DELAYED_FLAG = tag_flag("Delayed")
+# weakness break dmg and delayed dmg are only affected by break effect
+BREAK_EFFECT_ONLY_FLAGS = BREAK_FLAG | DELAYED_FLAG
+# DoT and weakness break damage can't crit
+NO_CRIT_FLAGS = BREAK_FLAG | DOT_FLAG | DELAYED_FLAG
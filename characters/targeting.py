@@ -0,0 +1,101 @@
+from bisect import bisect_left
+from characters.stat_vector import *
+
+
+class TauntTable:
+    """
+    The cumulative chances of the units of one side to be targeted, which are proportional to their Taunt.\n
+    Units pick a target on every action, but Taunt rarely changes. The units of a side share one table (see
+    choose_target(.)), which keeps the cumulative chances until a unit of the side tells it that its Taunt has changed
+    (see Unit.recount_buff_debuff(.)). So picking a target is one binary search. It does the same arithmetic and draws
+    the same random number as a linear walk over the normalised Taunts, so the same seed picks the same targets.
+
+    Attributes:
+    ----------
+    units: list
+        The units the table was built for, each of them has the table as its taunt_table
+    cdf: list
+        The cumulative chance of each unit
+    outdated: bool
+        Whether the Taunt of a unit has changed since the table was built
+    """
+
+    def __init__(self):
+        self.units = ()
+        self.cdf = []
+        self.outdated = True
+
+    def invalidate(self):
+        """
+        Tells the table the Taunt of one of its units has changed, it is rebuilt before the next pick.
+        """
+        self.outdated = True
+
+    def rebuild(self, units):
+        """
+        Builds the cumulative chances and makes the table the taunt_table of the units.
+
+        Parameters:
+        ----------
+        units: list
+            The units of the side
+        """
+        for unit in units:
+            if unit.taunt_table is not self:
+                # the unit's changes won't reach its old table anymore
+                unit.taunt_table.invalidate()
+                unit.taunt_table = self
+        self.units = units
+        taunts = [unit.runtime_stats.array[Stat.TAUNT] for unit in units]
+        sigma = sum(taunts)
+        cdf = 0
+        self.cdf = []
+        for taunt in taunts:
+            cdf += taunt / sigma
+            self.cdf.append(cdf)
+        self.outdated = False
+
+    def choose(self, units, rng):
+        """
+        Randomly chooses a unit based on their Taunt stats.
+
+        Parameters:
+        ----------
+        units: list
+            The units of the side
+        rng: Random
+            The random number generator of the battle
+
+        Returns:
+        -------
+        The selected unit, or None if rounding left the random number past the last cumulative chance
+        """
+        if units is not self.units:
+            # the same side is usually passed as the same list
+            if tuple(units) != tuple(self.units):
+                self.outdated = True
+            self.units = units
+        if self.outdated:
+            self.rebuild(units)
+        index = bisect_left(self.cdf, rng.random())
+        return units[index] if index < len(units) else None
+
+
+def choose_target(units, rng):
+    """
+    Randomly choose a unit of a side based on their Taunt stats, with the table the units of the side share.
+
+    Parameters:
+    ----------
+    units: list
+        The units of the side, e.g. the player units for an enemy
+    rng: Random
+        The random number generator of the battle
+
+    Returns:
+    -------
+    The selected target, or None if there are no units
+    """
+    if not units:
+        return None
+    return units[0].taunt_table.choose(units, rng)
@@ -1,5 +1,24 @@
 from abc import ABC, abstractmethod
-from random import random
+from collections.abc import MutableMapping
+from random import Random
+from characters.stat_vector import *
+from characters.buff import *
+from characters.buff_store import *
+from characters.modifier import *
+from characters.tags import *
+from characters.targeting import *
+
+# stats that are dictionaries of values for each damage type
+STATS_WITH_DMG_TYPE = ("DMG Boost", "RES Boost", "DMG Taken Increase", "RES PEN")
+# adds a stack to the Entanglement on a unit when it is hit
+# the fields with None are not needed for adding a stack
+ENTANGLEMENT_STACK = intern_buff(
+    "Entanglement", "Crowd Control", "Quantum", "Flat", None, None, None, 5, 1, "Start", 1, "Start", True
+)
+DMG_BOOST_OFFSETS = BLOCK_OFFSETS["DMG Boost"]
+RES_BOOST_OFFSETS = BLOCK_OFFSETS["RES Boost"]
+DMG_TAKEN_INCREASE_OFFSETS = BLOCK_OFFSETS["DMG Taken Increase"]
+RES_PEN_OFFSETS = BLOCK_OFFSETS["RES PEN"]
 
 
 class Unit(ABC):
@@ -25,11 +44,18 @@ class Unit(ABC):
         The unit's level
     max_energy: int
         The unit's max energy
-    stats: dict
-        The base stats of the unit\n
+    stats: StatVector
+        The base stats of the unit, used like a dictionary of the stats\n
         The stats names are directly copied from the game (HP actually means Max HP)
-    runtime_stats: dict
+    runtime_stats: StatVector
         The runtime stats of the unit in battle
+    stat_changes: set
+        The units whose runtime_stats have changed since the action queue last looked\n
+        The operating system gives all the units the queue's set, so the queue only checks their speed.
+    lazy_runtime_stats: bool
+        Whether changes to the stats and the buffs/debuffs only mark runtime_stats out of date\n
+        When it is out of date, runtime_stats is replaced by an OutdatedRuntimeStats which rebuilds it the first time
+        it is used. Reading up-to-date stats costs nothing extra.
     weaknesses: set
         The weaknesses of the unit (empty for player players)
     max_toughness: int
@@ -40,18 +66,64 @@ class Unit(ABC):
         Whether ultimate can be used during the unit's extra turn
     in_extra_turn: bool
         A flag indicating whether the unit is running an extra turn
-    buffs: list
-        The list of buffs on the unit
-    debuffs: list
-        The list of debuffs on the unit
+    requests_extra_turns: bool
+        Whether the unit asks for its extra turns with request_extra_turn(.)\n
+        If not, and it overrides check_extra_turn(.), the operating system asks it after every action and ultimate.
+    extra_turn_requests: set
+        The units that have asked for an extra turn and haven't been checked yet\n
+        The operating system gives all the units the battle's set.
+    rng: Random
+        The random number generator used for all rng checks\n
+        The operating system replaces it with the battle's generator, so all units in a battle share one seeded stream
+    taunt_table: TauntTable
+        The chances of the units of the unit's side to be picked as the target by Taunt, shared by the side\n
+        The unit invalidates it when its Taunt changes, see choose_target(.).
+    buffs: BuffStore
+        The buffs on the unit
+    debuffs: BuffStore
+        The debuffs on the unit
+    crowd_control: set
+        The IDs of the crowd control debuffs on the unit
+    stat_contributions: dict
+        What each buff/debuff adds to runtime_stats, keyed by ("Buff", ID) or ("Debuff", ID)\n
+        A (type_name, dmg_type, value, source_value) tuple that lets the effect be taken back without a rebuild
+    percentage_contributions: set
+        The keys of the contributions that are a percentage of the source's stats
+    stat_dependents: set
+        The units with buffs/debuffs that are a percentage of this unit's stats\n
+        They are recounted when this unit's runtime_stats change, see runtime_stats_changed(.). A unit stays in the
+        set until it is found to have no such buff/debuff left.
+    updating_dependents: bool
+        Whether the unit is in the middle of recounting its stat_dependents
+    conditional_modifiers: dict
+        The conditional modifiers of the unit for each stat they change, see modifier.py
+    outgoing_dmg_multipliers: dict
+        The DMG Boost multiplier of the unit's damage for each tag ID (see tags.py)\n
+        A (version, multiplier) pair, where version is the version of runtime_stats it was computed with
+    incoming_dmg_multipliers: dict
+        The DEF, RES, DMG Taken Increase and DMG Taken Decrease multiplier of the damage the unit takes for each
+        (source, tag ID)\n
+        A (version, source's version, multiplier) tuple, it is used while neither unit's runtime_stats has changed
+    extra_commands_events: set
+        The blackboard event types after which the unit needs to be checked for extra commands
+    extra_action_events: set
+        The blackboard event types after which the unit needs to be checked for extra actions
     hp: float
         The unit's current HP
     energy: float
-        The unit's current energy
-    dmg_dealt_record: dict
-        A record of the damage the unit dealt classified into different sources
-    break_dmg_dealt_record: dict
-        A record of the break damage the unit dealt classified into different sources
+        The unit's current energy\n
+        Setting it keeps ult_candidates up to date.
+    ult_energy_cost: float
+        The energy the unit needs before try_activate_ult(.) can return an ultimate, max_energy by default\n
+        Units that can use their ultimate with less energy lower it, 0 means try_activate_ult(.) is always asked.
+    ult_candidates: set
+        The units that have at least ult_energy_cost energy\n
+        The operating system gives all the players the battle's set, so it only asks them for ultimates.
+    dmg_dealt_by_tags: dict
+        The damage the unit dealt for each tag ID, in the order the tags were first recorded\n
+        Read dmg_dealt_record for the record keyed by the names of the tags.
+    break_dmg_dealt_by_tags: dict
+        The break damage the unit dealt for each tag ID
     """
 
     # initialize stats
@@ -90,7 +162,8 @@ class Unit(ABC):
         self.max_energy = max_energy
         # character's base stats (only the ones that can be affected by buffs/debuffs should be here)
         # the whole point of using dict is for buffs can be implemented easily
-        self.stats = {
+        # the dict is stored in a flat array (see stat_vector.py), hot code reads the array with the offsets in Stat
+        self.stats = StatVector({
             "Taunt": taunt,
             "HP": hp,
             "ATK": atk,
@@ -141,7 +214,7 @@ class Unit(ABC):
                 "Imaginary": 0
             },
             "Weaken": 0
-        }
+        })
         # sometimes the unit returns a reference to itself
         # or the unit might need to call its own methods using self.foo(.)
         # but when the unit decorated, e.g. by a light cone, self should mean the outer most decorator
@@ -151,15 +224,7 @@ class Unit(ABC):
         self.decorated_self = self
         # run time stats are used in calculations
         # they can be affected by buffs/debuffs
-        self.runtime_stats = {stats_type: self.stats[stats_type] for stats_type in self.stats}
-        stats_dict = self.stats["DMG Boost"]
-        self.runtime_stats["DMG Boost"] = {key: stats_dict[key] for key in stats_dict}
-        stats_dict = self.stats["RES Boost"]
-        self.runtime_stats["RES Boost"] = {key: stats_dict[key] for key in stats_dict}
-        stats_dict = self.stats["DMG Taken Increase"]
-        self.runtime_stats["DMG Taken Increase"] = {key: stats_dict[key] for key in stats_dict}
-        stats_dict = self.stats["RES PEN"]
-        self.runtime_stats["RES PEN"] = {key: stats_dict[key] for key in stats_dict}
+        self.runtime_stats = self.stats.copy()
         # enemy units will redefine weaknesses and toughness
         # these are dummy attributes for player characters so all units can share the same dmg process
         self.weaknesses = set()
@@ -169,16 +234,68 @@ class Unit(ABC):
         # but we can do that for some other players which has low priority
         self.low_extra_turn_priority = True
         self.in_extra_turn = False
-        self.buffs = []
-        self.debuffs = []
+        self.requests_extra_turns = False
+        # outside a battle, the unit has its own set
+        self.extra_turn_requests = set()
+        # outside a battle, the unit has its own generator
+        self.rng = Random()
+        self.taunt_table = TauntTable()
+        # outside a battle, the unit has its own set
+        self.ult_candidates = set()
+        self.ult_energy_cost = max_energy
+        self.buffs = BuffStore()
+        self.debuffs = BuffStore()
         self.crowd_control = set()
+        # most units never run extra commands or take extra actions
+        # the ones that do need to subscribe to the events that can trigger them (decorators can subscribe too)
+        # the operating system won't bother checking the others
+        self.extra_commands_events = set()
+        self.extra_action_events = set()
+        self.stat_contributions = {}
+        self.percentage_contributions = set()
+        self.stat_dependents = set()
+        self.updating_dependents = False
+        self.conditional_modifiers = {modifier_type: [] for modifier_type in MODIFIER_TYPES}
+        # multi-hit attacks repeat the same multipliers, they are cached until the runtime stats change
+        self.outgoing_dmg_multipliers = {}
+        self.incoming_dmg_multipliers = {}
+        self.lazy_runtime_stats = False
+        # outside a battle, the unit has its own set
+        self.stat_changes = set()
         # initialize hp and energy
         self.decorated_self.refresh_runtime_stats()
         self.hp = self.runtime_stats["HP"]
         self.energy = max_energy / 2
 
-        self.dmg_dealt_record = {}
-        self.break_dmg_dealt_record = {}
+        self.dmg_dealt_by_tags = {}
+        self.break_dmg_dealt_by_tags = {}
+
+    @property
+    def energy(self):
+        return self.__energy
+
+    @energy.setter
+    def energy(self, value):
+        self.__energy = value
+        # energy is what decides whether a character can use ultimate, the index is updated when it crosses the cost
+        if value >= self.ult_energy_cost:
+            self.ult_candidates.add(self.decorated_self)
+        else:
+            self.ult_candidates.discard(self.decorated_self)
+
+    @property
+    def dmg_dealt_record(self):
+        """
+        A record of the damage the unit dealt classified into different sources, keyed by the tags joined by spaces.
+        """
+        return {TAG_SETS[tag_id].name: dmg for tag_id, dmg in self.dmg_dealt_by_tags.items()}
+
+    @property
+    def break_dmg_dealt_record(self):
+        """
+        A record of the break damage the unit dealt classified into different sources.
+        """
+        return {TAG_SETS[tag_id].name: break_dmg for tag_id, break_dmg in self.break_dmg_dealt_by_tags.items()}
 
     @abstractmethod
     def choose_action(self, enemies, players, sp):
@@ -214,9 +331,46 @@ class Unit(ABC):
             self.toughness = self.max_toughness
         return self.decorated_self.choose_action(enemies, players, sp)
 
+    def subscribe_extra_commands(self, *event_types):
+        """
+        Declares the blackboard events that can make the unit run extra commands.
+        After a batch of commands, the operating system only calls check_extra_commands(.) on the units subscribed to
+        the events written on the blackboard by that batch. Subscribe to "All" to be checked after every batch.
+        A unit that overrides check_extra_commands(.) without subscribing to anything is checked after every batch.
+
+        Parameters:
+        ----------
+        event_types: str
+            The command types or action types, e.g. "DMG", "Start ATK", "Lose SP", "Ultimate"
+        """
+        self.extra_commands_events.update(event_types)
+
+    def subscribe_extra_action(self, *event_types):
+        """
+        Declares the blackboard events that can make the unit take extra actions.
+        After an action, the operating system only calls check_extra_action(.) on the units subscribed to the events
+        written on the blackboard during that action. Subscribe to "All" to be checked after every action.
+        A unit that overrides check_extra_action(.) without subscribing to anything is checked after every action.
+
+        Parameters:
+        ----------
+        event_types: str
+            The command types or action types, e.g. "DMG", "Start ATK", "Lose SP", "Ultimate"
+        """
+        self.extra_action_events.update(event_types)
+
+    def request_extra_turn(self):
+        """
+        Asks the operating system to call check_extra_turn(.) the next time it checks for extra turns.
+        The units that set requests_extra_turns aren't checked otherwise.
+        """
+        self.extra_turn_requests.add(self.decorated_self)
+
     def check_extra_commands(self, enemies, players, blackboard):
         """
         Checks if the unit wants to run any extra command. If so, return a batch of commands.
+        Only called after the events the unit subscribed to with subscribe_extra_commands(.), or after every batch if
+        it hasn't subscribed to any.
 
         Parameters:
         ----------
@@ -224,8 +378,9 @@ class Unit(ABC):
             The tuple of enemy units
         players: tuple
             The tuple of player units
-        blackboard: list
-            A list of all actions/commands executed this turn
+        blackboard: Blackboard
+            A list of all actions/commands executed this turn (Event records, see events.py)\n
+            blackboard.read_new(self, code) gives the events the unit hasn't read yet.
 
         Returns:
         -------
@@ -236,6 +391,8 @@ class Unit(ABC):
     def check_extra_action(self, enemies, players, blackboard):
         """
         Checks if the unit wants to run any extra action. If so, return an action.
+        Only called after the events the unit subscribed to with subscribe_extra_action(.), or after every action if
+        it hasn't subscribed to any.
 
         Parameters:
         ----------
@@ -243,8 +400,9 @@ class Unit(ABC):
             The tuple of enemy units
         players: tuple
             The tuple of player units
-        blackboard: list
-            A list of all actions/commands executed this turn
+        blackboard: Blackboard
+            A list of all actions/commands executed this turn (Event records, see events.py)\n
+            blackboard.read_new(self, code) gives the events the unit hasn't read yet.
 
         Returns:
         -------
@@ -255,6 +413,7 @@ class Unit(ABC):
     def check_extra_turn(self, enemies, players, sp, blackboard):
         """
         Checks if the unit wants to run any extra turn. If so, return an action.
+        The units that set requests_extra_turns are only checked after request_extra_turn(.).
 
         Parameters:
         ----------
@@ -264,8 +423,9 @@ class Unit(ABC):
             The tuple of player units
         sp:
             The number of skill points available
-        blackboard: list
-            A list of all actions/commands executed this turn
+        blackboard: Blackboard
+            A list of all actions/commands executed this turn (Event records, see events.py)\n
+            blackboard.read_new(self, code) gives the events the unit hasn't read yet.
 
         Returns:
         -------
@@ -286,48 +446,47 @@ class Unit(ABC):
         # might produce commands for DoT or healing, etc.
         commands = []
         removed_ones = []
-        removed_any = False
-        for buff in self.buffs:
-            if buff["Decay"] == "Start" and not buff["Locked"]:
-                buff["Turn"] -= 1
-                if buff["Turn"] <= 0:
+        for buff in self.buffs.decaying_at("Start"):
+            if not buff.locked:
+                buff.turn -= 1
+                if buff.turn <= 0:
                     removed_ones.append(buff)
-                    removed_any = True
-            if buff["Type"] == "Heal":
-                hp = buff["Stack"] * buff["Value"]
-                if buff["Value Type"] == "Percentage":
-                    hp *= buff["Source"].runtime_stats[buff["Source Stats"]]
+        for buff in self.buffs.ticking.values():
+            if buff.type == "Heal":
+                hp = buff.stack * buff.value
+                if buff.value_type == "Percentage":
+                    hp *= buff.source.runtime_stats[buff.source_stats]
                 data = ((self.decorated_self, hp),)
-                commands.append(("Heal", buff["Source"], data))
+                commands.append(("Heal", buff.source, data))
         for buff in removed_ones:
             self.buffs.remove(buff)
+            self.decorated_self.recount_buff_debuff("Buff", buff, False)
         removed_ones = []
-        for debuff in self.debuffs:
-            if debuff["Decay"] == "Start" and not debuff["Locked"]:
-                debuff["Turn"] -= 1
-                if debuff["Turn"] <= 0:
+        for debuff in self.debuffs.decaying_at("Start"):
+            if not debuff.locked:
+                debuff.turn -= 1
+                if debuff.turn <= 0:
                     removed_ones.append(debuff)
-                    removed_any = True
-            if debuff["Type"] == "DoT":
-                dmg = debuff["Stack"] * debuff["Value"]
-                if debuff["Value Type"] == "Percentage":
-                    dmg *= debuff["Source"].runtime_stats[debuff["Source Stats"]]
-                tags = (debuff["ID"], "DoT", debuff["DMG Type"])
+        for debuff in self.debuffs.ticking.values():
+            if debuff.type == "DoT":
+                dmg = debuff.stack * debuff.value
+                if debuff.value_type == "Percentage":
+                    dmg *= debuff.source.runtime_stats[debuff.source_stats]
+                tags = intern_tags(debuff.id, "DoT", debuff.dmg_type)
                 data = ((self.decorated_self, (dmg, 0), tags),)
-                commands.append(("DMG", debuff["Source"], data))
-            elif debuff["Type"] == "Crowd Control":
+                commands.append(("DMG", debuff.source, data))
+            elif debuff.type == "Crowd Control":
                 # some crowd control such as entanglement deals additional damage at turn start
-                if debuff["DMG Type"]:
-                    dmg = debuff["Stack"] * debuff["Value"]
-                    if debuff["Value Type"] == "Percentage":
-                        dmg *= debuff["Source"].runtime_stats[debuff["Source Stats"]]
-                    tags = (debuff["ID"], "Delayed", "Additional", debuff["DMG Type"])
+                if debuff.dmg_type:
+                    dmg = debuff.stack * debuff.value
+                    if debuff.value_type == "Percentage":
+                        dmg *= debuff.source.runtime_stats[debuff.source_stats]
+                    tags = intern_tags(debuff.id, "Delayed", "Additional", debuff.dmg_type)
                     data = ((self.decorated_self, (dmg, 0), tags),)
-                    commands.append(("DMG", debuff["Source"], data))
+                    commands.append(("DMG", debuff.source, data))
         for debuff in removed_ones:
             self.debuffs.remove(debuff)
-        if removed_any:
-            self.decorated_self.refresh_runtime_stats()
+            self.decorated_self.recount_buff_debuff("Debuff", debuff, False)
         return tuple(commands)
 
     def end_turn(self):
@@ -342,40 +501,37 @@ class Unit(ABC):
         commands = []
         self.decorated_self.unlock_buffs_debuffs("End")
         removed_ones = []
-        removed_any = False
-        for buff in self.buffs:
-            if buff["Decay"] == "End" and not buff["Locked"]:
-                buff["Turn"] -= 1
-                if buff["Turn"] <= 0:
+        for buff in self.buffs.decaying_at("End"):
+            if not buff.locked:
+                buff.turn -= 1
+                if buff.turn <= 0:
                     removed_ones.append(buff)
-                    removed_any = True
         for buff in removed_ones:
             self.buffs.remove(buff)
+            self.decorated_self.recount_buff_debuff("Buff", buff, False)
         removed_ones = []
-        for debuff in self.debuffs:
-            if debuff["Decay"] == "End" and not debuff["Lock"]:
-                debuff["Turn"] -= 1
-                if debuff["Turn"] <= 0:
+        for debuff in self.debuffs.decaying_at("End"):
+            if not debuff.locked:
+                debuff.turn -= 1
+                if debuff.turn <= 0:
                     removed_ones.append(debuff)
-                    removed_any = True
-        for debuff in removed_ones:
-            self.debuffs.remove(debuff)
         if "Freeze" in self.crowd_control:
             data = ((self.decorated_self, 0.5),)
             commands.append(("Advance", self.decorated_self, data))
-        if removed_any:
-            self.decorated_self.refresh_runtime_stats()
+        for debuff in removed_ones:
+            self.debuffs.remove(debuff)
+            self.decorated_self.recount_buff_debuff("Debuff", debuff, False)
         return tuple(commands)
 
     def add_buff(self, new_buff):
         """
-        Adds a buff to this unit and automatically refreshes runtime stats. Adding an existing one stacks/renews it.
+        Adds a buff to this unit and automatically updates runtime stats. Adding an existing one stacks/renews it.
 
         Parameters:
         ----------
-        new_buff: dict
-            The buff to be added\n
-            An template buff = {
+        new_buff: Buff
+            The buff to be added, a prototype (see buff.py) is copied the first time it is added\n
+            It can also be a dictionary with the same fields, e.g. a template buff = {
                 "ID": "Example Buff",\n
                 "Type": "DMG Boost",\n
                 "DMG Type": "Fire",\n
@@ -391,29 +547,35 @@ class Unit(ABC):
                 "Locked": True\n
             }
         """
-        for buff in self.buffs:
-            if buff["ID"] == new_buff["ID"]:
-                new_stack = buff["Stack"] + new_buff["Stack"]
-                if new_stack > buff["Max Stack"]:
-                    new_stack = buff["Max Stack"]
-                buff["Value"] = new_buff["Value"]
-                buff["Stack"] = new_stack
-                buff["Turn"] = new_buff["Turn"]
-                buff["Locked"] = new_buff["Locked"]
-                break
+        if type(new_buff) is dict:
+            new_buff = Buff.from_dict(new_buff)
+        buff = self.buffs.get(new_buff.id)
+        if buff is not None:
+            new_stack = buff.stack + new_buff.stack
+            if new_stack > buff.max_stack:
+                new_stack = buff.max_stack
+            buff.value = new_buff.value
+            buff.stack = new_stack
+            buff.turn = new_buff.turn
+            buff.locked = new_buff.locked
+            # it might be locked again
+            self.buffs.add(buff)
+            self.decorated_self.recount_buff_debuff("Buff", buff, True)
         else:
-            self.buffs.append(new_buff)
-        self.decorated_self.refresh_runtime_stats()
+            if new_buff.prototype:
+                new_buff = new_buff.copy()
+            self.buffs.add(new_buff)
+            self.decorated_self.recount_buff_debuff("Buff", new_buff, True)
 
     def add_debuff(self, new_debuff):
         """
-        Adds a debuff to this unit and automatically refreshes runtime stats. Adding an existing one stacks/renews it.
+        Adds a debuff to this unit and automatically updates runtime stats. Adding an existing one stacks/renews it.
 
         Parameters:
         ----------
-        new_debuff: dict
-            The debuff to be added\n
-            An template debuff = {
+        new_debuff: Buff
+            The debuff to be added, a prototype (see buff.py) is copied the first time it is added\n
+            It can also be a dictionary with the same fields, e.g. a template debuff = {
                 "ID": "Example Debuff",\n
                 "Type": "DoT",\n
                 "DMG Type": "Physical",\n
@@ -429,19 +591,25 @@ class Unit(ABC):
                 "Locked": True\n
             }
         """
-        for debuff in self.debuffs:
-            if debuff["ID"] == new_debuff["ID"]:
-                new_stack = debuff["Stack"] + new_debuff["Stack"]
-                if new_stack > debuff["Max Stack"]:
-                    new_stack = debuff["Max Stack"]
-                debuff["Value"] = new_debuff["Value"]
-                debuff["Stack"] = new_stack
-                debuff["Turn"] = new_debuff["Turn"]
-                debuff["Locked"] = new_debuff["Locked"]
-                break
+        if type(new_debuff) is dict:
+            new_debuff = Buff.from_dict(new_debuff)
+        debuff = self.debuffs.get(new_debuff.id)
+        if debuff is not None:
+            new_stack = debuff.stack + new_debuff.stack
+            if new_stack > debuff.max_stack:
+                new_stack = debuff.max_stack
+            debuff.value = new_debuff.value
+            debuff.stack = new_stack
+            debuff.turn = new_debuff.turn
+            debuff.locked = new_debuff.locked
+            # it might be locked again
+            self.debuffs.add(debuff)
+            self.decorated_self.recount_buff_debuff("Debuff", debuff, True)
         else:
-            self.debuffs.append(new_debuff)
-        self.decorated_self.refresh_runtime_stats()
+            if new_debuff.prototype:
+                new_debuff = new_debuff.copy()
+            self.debuffs.add(new_debuff)
+            self.decorated_self.recount_buff_debuff("Debuff", new_debuff, True)
 
     def amend_outgoing_effect_chance(self, chance, target, enemies, players):
         """
@@ -462,7 +630,7 @@ class Unit(ABC):
         -------
         The modified chance (can be more than 1)
         """
-        return (1 + self.runtime_stats["Effect Hit Rate"]) * chance
+        return (1 + self.runtime_stats.array[Stat.EFFECT_HIT_RATE]) * chance
 
     def amend_incoming_effect_chance(self, chance, debuff, source, enemies, players):
         """
@@ -472,7 +640,7 @@ class Unit(ABC):
         ----------
         chance: float
             The chance to apply debuff (can be more than 1)
-        debuff: dict
+        debuff: Buff
             The debuff to be added
         source: Unit
             The source unit of the debuff
@@ -485,9 +653,9 @@ class Unit(ABC):
         -------
         The modified chance restricted to the range [0, 1]
         """
-        chance = (1 - self.runtime_stats["Effect RES"]) * chance
+        chance = (1 - self.runtime_stats.array[Stat.EFFECT_RES]) * chance
         if debuff["Type"] == "Crowd Control":
-            chance *= (1 - self.runtime_stats["Crowd Control RES"])
+            chance *= (1 - self.runtime_stats.array[Stat.CROWD_CONTROL_RES])
         if chance < 0:
             chance = 0
         elif chance > 1:
@@ -502,14 +670,14 @@ class Unit(ABC):
         ----------
         chance: float
             The chance to apply debuff (can be more than 1)
-        new_debuff: dict
+        new_debuff: Buff
             The debuff to be added
 
         Returns:
         -------
         True if the debuff is successfully applied
         """
-        if random() < chance:
+        if self.rng.random() < chance:
             self.decorated_self.add_debuff(new_debuff)
             return True
         return False
@@ -520,11 +688,11 @@ class Unit(ABC):
 
         Parameters:
         ----------
-        buff: dict
+        buff: Buff
             The buff to be removed from this unit
         """
-        self.buffs.remove(buff)
-        self.decorated_self.refresh_runtime_stats()
+        buff = self.buffs.remove(buff)
+        self.decorated_self.recount_buff_debuff("Buff", buff, False)
 
     def dispel_debuff(self, debuff):
         """
@@ -532,11 +700,11 @@ class Unit(ABC):
 
         Parameters:
         ----------
-        debuff: dict
+        debuff: Buff
             The debuff to be removed from this unit
         """
-        self.debuffs.remove(debuff)
-        self.decorated_self.refresh_runtime_stats()
+        debuff = self.debuffs.remove(debuff)
+        self.decorated_self.recount_buff_debuff("Debuff", debuff, False)
 
     def unlock_buffs_debuffs(self, keyword):
         """
@@ -547,65 +715,264 @@ class Unit(ABC):
         keyword: str
             The keyword to search for when unlocking buffs/debuffs
         """
-        for buff in self.buffs:
-            if buff["Unlock"] == keyword:
-                buff["Locked"] = False
-        for debuff in self.debuffs:
-            if debuff["Unlock"] == keyword:
-                debuff["Locked"] = False
+        self.buffs.unlock(keyword)
+        self.debuffs.unlock(keyword)
+
+    def add_conditional_modifier(self, modifier):
+        """
+        Adds a stat bonus that only applies to the hits that meet its conditions.
+
+        Parameters:
+        ----------
+        modifier: ConditionalModifier
+            The modifier to be added
+        """
+        self.conditional_modifiers[modifier.type].append(modifier)
+
+    def remove_conditional_modifier(self, modifier):
+        """
+        Removes a conditional modifier.
+
+        Parameters:
+        ----------
+        modifier: ConditionalModifier
+            The modifier to be removed
+        """
+        self.conditional_modifiers[modifier.type].remove(modifier)
+
+    def invalidate_runtime_stats(self):
+        """
+        Tells the unit its stats have changed. Call it after changing the base stats (stats, extra_stats).\n
+        In lazy mode, runtime_stats is rebuilt the next time it is read, so several changes in a row only cost one
+        rebuild. Otherwise, it is rebuilt right away.
+        """
+        if not self.lazy_runtime_stats:
+            self.decorated_self.refresh_runtime_stats()
+            return
+        # the base Taunt may have changed
+        self.taunt_table.invalidate()
+        if type(self.runtime_stats) is not OutdatedRuntimeStats:
+            self.runtime_stats = OutdatedRuntimeStats(self, self.runtime_stats)
+        self.runtime_stats_changed()
+
+    def runtime_stats_changed(self):
+        """
+        Tells the ones that keep track of the unit's runtime_stats that they have changed (or are out of date in lazy
+        mode). refresh_runtime_stats(.), invalidate_runtime_stats(.) and recount_buff_debuff(.) call it.\n
+        The units in stat_dependents recount their buffs/debuffs that are a percentage of this unit's stats, which may
+        change their own runtime_stats in turn. A cycle of such buffs/debuffs is only followed once around.
+        """
+        # the action queue only checks the speed of these units
+        self.stat_changes.add(self.decorated_self)
+        if self.stat_dependents and not self.updating_dependents:
+            self.updating_dependents = True
+            try:
+                for dependent in list(self.stat_dependents):
+                    dependent.recount_percentage_buff_debuffs(self)
+            finally:
+                self.updating_dependents = False
 
     def refresh_runtime_stats(self):
         """
-        Updates runtime stats according to the buffs/debuffs on this unit. It rebuilds runtime_stats from base stats and
-        buffs/debuffs.
-        """
-        stats_with_dmg_type = ("DMG Boost", "RES Boost", "DMG Taken Increase", "RES PEN")
-        # make a deep copy
-        for key in self.stats:
-            stats = self.stats[key]
-            if type(stats) is dict:
-                for sub_key in stats:
-                    self.runtime_stats[key][sub_key] = stats[sub_key]
-            else:
-                self.runtime_stats[key] = stats
+        Rebuilds runtime_stats from base stats and all the buffs/debuffs on this unit, and tells the ones that keep
+        track of them (see runtime_stats_changed(.)). Call it after changing the base stats, or call
+        invalidate_runtime_stats(.), which waits for the next read in lazy mode.\n
+        Adding and removing buffs/debuffs doesn't need a rebuild, they update runtime_stats with
+        recount_buff_debuff(.).
+        """
+        if type(self.runtime_stats) is OutdatedRuntimeStats:
+            self.runtime_stats = self.runtime_stats.runtime_stats
+        taunt = self.runtime_stats.array[Stat.TAUNT]
+        self.decorated_self.rebuild_runtime_stats()
+        if self.runtime_stats.array[Stat.TAUNT] != taunt:
+            self.taunt_table.invalidate()
+        self.runtime_stats_changed()
+
+    def rebuild_runtime_stats(self):
+        """
+        Rebuilds runtime_stats from base stats and all the buffs/debuffs on this unit, without telling anyone. Units
+        with stats that don't come from either (e.g. Character.extra_stats) add them here.
+        """
+        # copy the base stats in one go, this also drops the entries added by buffs/debuffs
+        self.runtime_stats.copy_from(self.stats)
         self.crowd_control = set()
+        self.stat_contributions = {}
+        self.percentage_contributions = set()
         # count buffs/debuffs
         for buff in self.buffs:
-            type_name = buff["Type"]
-            dmg_type = buff["DMG Type"]
-            value = buff["Stack"] * buff["Value"]
-            if buff["Value Type"] == "Percentage":
-                value *= buff["Source"].runtime_stats[buff["Source Stats"]]
-            if type_name == "DMG Taken Decrease":
-                self.runtime_stats[type_name] = 1 - (1 - self.runtime_stats[type_name]) * (1 - value)
-            elif type_name in stats_with_dmg_type:
-                if dmg_type in self.runtime_stats[type_name]:
-                    self.runtime_stats[type_name][dmg_type] += value
-                else:
-                    self.runtime_stats[type_name][dmg_type] = value
-            elif type_name in self.runtime_stats:
-                self.runtime_stats[type_name] += value
+            self.count_buff_debuff("Buff", buff)
         for debuff in self.debuffs:
-            type_name = debuff["Type"]
-            dmg_type = debuff["DMG Type"]
-            value = debuff["Stack"] * debuff["Value"]
-            if debuff["Value Type"] == "Percentage":
-                value *= debuff["Source"].runtime_stats[debuff["Source Stats"]]
-            if type_name in stats_with_dmg_type:
-                if dmg_type in self.runtime_stats[type_name]:
-                    self.runtime_stats[type_name][dmg_type] -= value
+            self.count_buff_debuff("Debuff", debuff)
+        # avoid non-positive speed
+        array = self.runtime_stats.array
+        if array[Stat.SPD] < 0.01:
+            array[Stat.SPD] = 0.01
+            self.runtime_stats.touch()
+
+    def count_buff_debuff(self, kind, buff_debuff):
+        """
+        Adds the effect of a buff/debuff to runtime_stats and records it in stat_contributions.
+
+        Parameters:
+        ----------
+        kind: str
+            "Buff" or "Debuff"
+        buff_debuff: Buff
+            The buff/debuff to be counted
+        """
+        type_name = buff_debuff.type
+        dmg_type = buff_debuff.dmg_type
+        value = buff_debuff.stack * buff_debuff.value
+        source_value = None
+        if buff_debuff.value_type == "Percentage":
+            source_value = buff_debuff.source.runtime_stats.array[STAT_OFFSETS[buff_debuff.source_stats]]
+            value *= source_value
+        runtime_stats = self.runtime_stats
+        array = runtime_stats.array
+        if kind == "Buff" and type_name == "DMG Taken Decrease":
+            array[Stat.DMG_TAKEN_DECREASE] = 1 - (1 - array[Stat.DMG_TAKEN_DECREASE]) * (1 - value)
+        else:
+            if kind == "Debuff":
+                value = -value
+            offset = STAT_OFFSETS.get(type_name)
+            if offset is not None:
+                array[offset] += value
+            elif type_name in STATS_WITH_DMG_TYPE:
+                offset = BLOCK_OFFSETS[type_name].get(dmg_type)
+                if offset is not None and offset < Stat.FIXED_SIZE:
+                    array[offset] += value
                 else:
-                    self.runtime_stats[type_name][dmg_type] = -value
-            elif type_name in self.runtime_stats:
-                self.runtime_stats[type_name] -= value
-            elif type_name == "Crowd Control":
-                debuff_id = debuff["ID"]
+                    # a new entry like the DMG Boost of "Basic ATK", let the block add it
+                    stats_block = runtime_stats[type_name]
+                    if dmg_type in stats_block:
+                        stats_block[dmg_type] += value
+                    else:
+                        stats_block[dmg_type] = value
+            elif type_name == "Crowd Control" and kind == "Debuff":
+                debuff_id = buff_debuff.id
                 self.crowd_control.add(debuff_id)
                 if debuff_id == "Imprisonment":
-                    self.runtime_stats["SPD"] -= value
-        # avoid non-positive speed
-        if self.runtime_stats["SPD"] < 0.01:
-            self.runtime_stats["SPD"] = 0.01
+                    array[Stat.SPD] += value
+        runtime_stats.touch()
+        if type_name == "Taunt":
+            self.taunt_table.invalidate()
+        key = (kind, buff_debuff.id)
+        self.stat_contributions[key] = (type_name, dmg_type, value, source_value)
+        if source_value is not None:
+            self.percentage_contributions.add(key)
+            # the source recounts it when its stats change
+            buff_debuff.source.stat_dependents.add(self.decorated_self)
+
+    def recount_buff_debuff(self, kind, buff_debuff, on_unit):
+        """
+        Updates runtime_stats after a buff/debuff is added, changed or removed.\n
+        The effect the buff/debuff had is taken back and its new effect is added, so the other buffs/debuffs aren't
+        counted again. Effects that can't be taken back exactly (SPD, which has a lower limit, and the multiplicative
+        DMG Taken Decrease) rebuild runtime_stats instead, but they are rare.
+
+        Parameters:
+        ----------
+        kind: str
+            "Buff" or "Debuff"
+        buff_debuff: Buff
+            The buff/debuff that was added, changed or removed
+        on_unit: bool
+            Whether the buff/debuff is still on the unit (False if it was removed)
+        """
+        if buff_debuff.type == "Taunt":
+            self.taunt_table.invalidate()
+        if type(self.runtime_stats) is OutdatedRuntimeStats:
+            # out of date already, the rebuild will count it
+            return
+        if self.lazy_runtime_stats:
+            self.runtime_stats = OutdatedRuntimeStats(self, self.runtime_stats)
+            self.runtime_stats_changed()
+            return
+        key = (kind, buff_debuff.id)
+        contribution = self.stat_contributions.get(key)
+        if contribution is not None and not self.discount_buff_debuff(key):
+            self.decorated_self.rebuild_runtime_stats()
+        elif on_unit and changes_speed_or_dmg_taken_decrease(buff_debuff.type, buff_debuff.id):
+            self.decorated_self.rebuild_runtime_stats()
+        elif on_unit:
+            self.count_buff_debuff(kind, buff_debuff)
+        self.runtime_stats_changed()
+
+    def recount_percentage_buff_debuffs(self, source):
+        """
+        Recounts the buffs/debuffs that are a percentage of a unit's stats after that unit's runtime_stats changed.
+        Only the ones whose source stat has a new value are recounted. Called by the source, see
+        runtime_stats_changed(.).
+
+        Parameters:
+        ----------
+        source: Unit
+            The unit whose runtime_stats changed
+        """
+        if type(self.runtime_stats) is OutdatedRuntimeStats:
+            # out of date already, the rebuild will count them
+            return
+        source = source.decorated_self
+        keys = []
+        for key in self.percentage_contributions:
+            kind, buff_id = key
+            buff_debuff = (self.buffs if kind == "Buff" else self.debuffs).get(buff_id)
+            if buff_debuff is not None and buff_debuff.source.decorated_self is source:
+                keys.append((key, buff_debuff))
+        if not keys:
+            # the buffs/debuffs have been removed since
+            source.stat_dependents.discard(self.decorated_self)
+            return
+        if self.lazy_runtime_stats:
+            for key, buff_debuff in keys:
+                if buff_debuff.type == "Taunt":
+                    self.taunt_table.invalidate()
+            self.runtime_stats = OutdatedRuntimeStats(self, self.runtime_stats)
+            self.runtime_stats_changed()
+            return
+        array = source.runtime_stats.array
+        changed = False
+        for key, buff_debuff in keys:
+            if array[STAT_OFFSETS[buff_debuff.source_stats]] != self.stat_contributions[key][3]:
+                changed = True
+                if not self.discount_buff_debuff(key):
+                    self.decorated_self.rebuild_runtime_stats()
+                    break
+                self.count_buff_debuff(key[0], buff_debuff)
+        if changed:
+            self.runtime_stats_changed()
+
+    def discount_buff_debuff(self, key):
+        """
+        Takes back the recorded effect of a buff/debuff.
+
+        Parameters:
+        ----------
+        key: tuple
+            The key of the effect in stat_contributions
+
+        Returns:
+        -------
+        False if the effect can't be taken back exactly and runtime_stats has to be rebuilt
+        """
+        type_name, dmg_type, value, source_value = self.stat_contributions[key]
+        if changes_speed_or_dmg_taken_decrease(type_name, key[1]):
+            return False
+        del self.stat_contributions[key]
+        self.percentage_contributions.discard(key)
+        runtime_stats = self.runtime_stats
+        array = runtime_stats.array
+        offset = STAT_OFFSETS.get(type_name)
+        if offset is not None:
+            array[offset] -= value
+        elif type_name in STATS_WITH_DMG_TYPE:
+            array[BLOCK_OFFSETS[type_name][dmg_type]] -= value
+        elif type_name == "Crowd Control" and key[0] == "Debuff":
+            self.crowd_control.discard(key[1])
+        runtime_stats.touch()
+        if type_name == "Taunt":
+            self.taunt_table.invalidate()
+        return True
 
     def start_atk(self, data, enemies, players):
         """
@@ -681,7 +1048,7 @@ class Unit(ABC):
         -------
         A tuple of commands
         """
-        self.energy += energy * (1 + self.runtime_stats["Energy Regeneration Rate"])
+        self.energy += energy * (1 + self.runtime_stats.array[Stat.ENERGY_REGENERATION_RATE])
         return tuple()
 
     def amend_outgoing_dmg(self, dmg_and_break, target, tags, enemies, players):
@@ -694,8 +1061,8 @@ class Unit(ABC):
             The damage and break damage pair
         target: Unit
             The target of the damage
-        tags: tuple
-            The list of all the tags attached to a damage\n
+        tags: Tags
+            The list of all the tags attached to a damage, interned (see tags.py)\n
             The first one is defined by the code that generated the DMG command ("Skill", "Basic ATK", etc.).
             The last one is always the damage type ("Physical", "Fire", etc.).
             Tags like "Follow-Up Attack" goes in the middle.
@@ -710,16 +1077,48 @@ class Unit(ABC):
         """
         dmg, break_dmg = dmg_and_break
         # weakness break dmg and delayed dmg are only affected by break effect
-        if "Break" in tags or "Delayed" in tags:
-            return dmg * (1 + self.runtime_stats["Break Effect"]), break_dmg
-        dmg_boost = self.runtime_stats["DMG Boost"]
-        multiplier1 = 1 + dmg_boost["All"]
-        for tag in tags:
-            if tag in dmg_boost:
-                multiplier1 += dmg_boost[tag]
-        multiplier2 = 1 - self.runtime_stats["Weaken"]
+        if tags.flags & BREAK_EFFECT_ONLY_FLAGS:
+            return dmg * (1 + self.runtime_stats.array[Stat.BREAK_EFFECT]), break_dmg
+        multiplier1 = self.dmg_boost_multiplier(target, tags)
+        multiplier2 = 1 - self.runtime_stats.array[Stat.WEAKEN]
         return multiplier1 * multiplier2 * dmg, break_dmg
 
+    def dmg_boost_multiplier(self, target, tags):
+        """
+        Calculates the DMG Boost multiplier of a damage, including the conditional modifiers.
+
+        Parameters:
+        ----------
+        target: Unit
+            The target of the damage
+        tags: Tags
+            The tags of the damage
+
+        Returns:
+        -------
+        1 + the DMG Boost of the damage
+        """
+        array = self.runtime_stats.array
+        version = self.runtime_stats.version
+        cached = self.outgoing_dmg_multipliers.get(tags.id)
+        if cached is not None and cached[0] == version:
+            multiplier = cached[1]
+        else:
+            size = len(array)
+            multiplier = 1 + array[Stat.DMG_BOOST]
+            for tag in tags:
+                offset = DMG_BOOST_OFFSETS.get(tag)
+                if offset is not None and offset < size:
+                    multiplier += array[offset]
+            self.outgoing_dmg_multipliers[tags.id] = (version, multiplier)
+        # the conditional modifiers depend on the target, they are added on every hit
+        modifiers = self.conditional_modifiers["DMG Boost"]
+        if modifiers:
+            for modifier in modifiers:
+                if modifier.applies(self, target, tags):
+                    multiplier += modifier.value
+        return multiplier
+
     def crit_dmg(self, dmg_and_break, target, tags, enemies, players, expected=True):
         """
         Calculates the critical outgoing damage. Calculates the expected damage by default.
@@ -730,8 +1129,8 @@ class Unit(ABC):
             The damage and break damage pair
         target: Unit
             The target of the damage
-        tags: tuple
-            The list of all the tags attached to a damage\n
+        tags: Tags
+            The list of all the tags attached to a damage, interned (see tags.py)\n
             The first one is defined by the code that generated the DMG command ("Skill", "Basic ATK", etc.).
             The last one is always the damage type ("Physical", "Fire", etc.).
             Tags like "Follow-Up Attack" goes in the middle.
@@ -750,21 +1149,90 @@ class Unit(ABC):
         crit = False
         multiplier = 1
         # DoT and weakness break damage can't crit
-        if "DoT" not in tags and "Break" not in tags and "Delayed" not in tags:
+        if not tags.flags & NO_CRIT_FLAGS:
             # in most cases just calculate the expected dmg
             # for effects that play with crit like Sleep Like the Dead, do crit rng check
+            crit_rate, crit_dmg = self.crit_rate_and_dmg(target, tags)
             if expected:
-                effective_crit_rate = self.runtime_stats["CRIT Rate"]
+                effective_crit_rate = crit_rate
                 if effective_crit_rate < 0:
                     effective_crit_rate = 0
                 elif effective_crit_rate > 1:
                     effective_crit_rate = 1
-                multiplier += effective_crit_rate * self.runtime_stats["CRIT DMG"]
-            elif random() < self.runtime_stats["CRIT Rate"]:
+                multiplier += effective_crit_rate * crit_dmg
+            elif self.rng.random() < crit_rate:
                 crit = True
-                multiplier += self.runtime_stats["CRIT DMG"]
+                multiplier += crit_dmg
         return (multiplier * dmg, break_dmg), crit
 
+    def crit_rate_and_dmg(self, target, tags):
+        """
+        Calculates the CRIT Rate and CRIT DMG of a damage, including the conditional modifiers.
+
+        Parameters:
+        ----------
+        target: Unit
+            The target of the damage
+        tags: Tags
+            The tags of the damage
+
+        Returns:
+        -------
+        The CRIT Rate and the CRIT DMG
+        """
+        array = self.runtime_stats.array
+        crit_rate = array[Stat.CRIT_RATE]
+        for modifier in self.conditional_modifiers["CRIT Rate"]:
+            if modifier.applies(self, target, tags):
+                crit_rate += modifier.value
+        crit_dmg = array[Stat.CRIT_DMG]
+        for modifier in self.conditional_modifiers["CRIT DMG"]:
+            if modifier.applies(self, target, tags):
+                crit_dmg += modifier.value
+        return crit_rate, crit_dmg
+
+    def outgoing_dmg_multiplier(self, target, tags):
+        """
+        Calculates what amend_outgoing_dmg(.) and crit_dmg(.) together multiply a damage by, with the expected crit.\n
+        The operating system uses it instead of the two hooks for the DMG commands with many targets when the unit
+        doesn't override them (see RailOperatingSystem.run_dmg(.)).
+
+        Parameters:
+        ----------
+        target: Unit
+            The target of the damage
+        tags: Tags
+            The tags of the damage
+
+        Returns:
+        -------
+        The multiplier
+        """
+        flags = tags.flags
+        if flags & BREAK_EFFECT_ONLY_FLAGS:
+            return 1 + self.runtime_stats.array[Stat.BREAK_EFFECT]
+        multiplier = self.dmg_boost_multiplier(target, tags) * (1 - self.runtime_stats.array[Stat.WEAKEN])
+        if not flags & NO_CRIT_FLAGS:
+            crit_rate, crit_dmg = self.crit_rate_and_dmg(target, tags)
+            if crit_rate < 0:
+                crit_rate = 0
+            elif crit_rate > 1:
+                crit_rate = 1
+            multiplier *= 1 + crit_rate * crit_dmg
+        return multiplier
+
+    def has_target_conditions(self):
+        """
+        Returns:
+        -------
+        True if some conditional modifier of the unit has a predicate, so its damage can depend on the target
+        """
+        for modifiers in self.conditional_modifiers.values():
+            for modifier in modifiers:
+                if modifier.predicate is not None:
+                    return True
+        return False
+
     def reduce_incoming_dmg(self, dmg_and_break, source, tags, enemies, players):
         """
         Calculates the reduced incoming damage affected by the the DEF, DEF Ignore, RES Boost, RES PEN
@@ -776,8 +1244,8 @@ class Unit(ABC):
             The damage and break damage pair
         source: Unit
             The source unit of the damage
-        tags: tuple
-            The list of all the tags attached to a damage\n
+        tags: Tags
+            The list of all the tags attached to a damage, interned (see tags.py)\n
             The first one is defined by the code that generated the DMG command ("Skill", "Basic ATK", etc.).
             The last one is always the damage type ("Physical", "Fire", etc.).
             Tags like "Follow-Up Attack" goes in the middle.
@@ -791,30 +1259,82 @@ class Unit(ABC):
         The modified (damage, break_damage)
         """
         dmg, break_dmg = dmg_and_break
-        effective_def = self.runtime_stats["DEF"] - source.runtime_stats["DEF Ignore"] * self.runtime_stats["DEF"]
+        if tags[-1] not in self.weaknesses:
+            break_dmg = 0
+        return self.incoming_dmg_multiplier(source, tags) * dmg, break_dmg
+
+    def incoming_dmg_multiplier(self, source, tags):
+        """
+        Calculates what reduce_incoming_dmg(.) multiplies a damage by.\n
+        The part that only depends on the runtime stats of the unit and the source is cached until either changes.
+
+        Parameters:
+        ----------
+        source: Unit
+            The source unit of the damage
+        tags: Tags
+            The tags of the damage
+
+        Returns:
+        -------
+        The multiplier
+        """
+        version = self.runtime_stats.version
+        source_version = source.runtime_stats.version
+        key = (source, tags.id)
+        cached = self.incoming_dmg_multipliers.get(key)
+        if cached is not None and cached[0] == version and cached[1] == source_version:
+            multiplier = cached[2]
+        else:
+            multiplier = self.base_incoming_dmg_multiplier(
+                self.runtime_stats.array, source, source.runtime_stats.array, tags
+            )
+            self.incoming_dmg_multipliers[key] = (version, source_version, multiplier)
+        if self.toughness > 0:
+            multiplier *= 0.9
+        return multiplier
+
+    def base_incoming_dmg_multiplier(self, array, source, source_array, tags):
+        """
+        Calculates the part of the incoming damage multiplier that only depends on the runtime stats of the unit and
+        the source, which incoming_dmg_multiplier(.) caches.
+
+        Parameters:
+        ----------
+        array: array
+            The unit's runtime stats array
+        source: Unit
+            The source unit of the damage
+        source_array: array
+            The source's runtime stats array
+        tags: Tags
+            The list of all the tags attached to a damage
+
+        Returns:
+        -------
+        The DEF, RES, DMG Taken Increase and DMG Taken Decrease multipliers multiplied together
+        """
+        effective_def = array[Stat.DEF] - source_array[Stat.DEF_IGNORE] * array[Stat.DEF]
         if effective_def < 0:
             effective_def = 0
         multiplier1 = (source.level * 10 + 200) / (source.level * 10 + 200 + effective_def)
         dmg_type = tags[-1]
-        effective_res = self.runtime_stats["RES Boost"][dmg_type] - source.runtime_stats["RES PEN"][dmg_type]
+        effective_res = array[RES_BOOST_OFFSETS[dmg_type]] - source_array[RES_PEN_OFFSETS[dmg_type]]
         if effective_res < -1:
             effective_res = -1
         elif effective_res > 0.9:
             effective_res = 0.9
         multiplier2 = 1 - effective_res
-        dmg_taken_increase = self.runtime_stats["DMG Taken Increase"]
-        multiplier3 = 1 + dmg_taken_increase["All"]
+        size = len(array)
+        multiplier3 = 1 + array[Stat.DMG_TAKEN_INCREASE]
         for tag in tags:
-            if tag in dmg_taken_increase:
-                multiplier3 += dmg_taken_increase[tag]
+            offset = DMG_TAKEN_INCREASE_OFFSETS.get(tag)
+            if offset is not None and offset < size:
+                multiplier3 += array[offset]
         if multiplier3 > 3.5:
             multiplier3 = 3.5
-        multiplier4 = 1 - self.runtime_stats["DMG Taken Decrease"]
-        if self.toughness > 0:
-            multiplier4 *= 0.9
-        if tags[-1] not in self.weaknesses:
-            break_dmg = 0
-        return multiplier1 * multiplier2 * multiplier3 * multiplier4 * dmg, break_dmg
+        multiplier4 = 1 - array[Stat.DMG_TAKEN_DECREASE]
+        return multiplier1 * multiplier2 * multiplier3 * multiplier4
 
     def take_dmg(self, dmg_and_break, source, tags, enemies, players):
         """
@@ -826,8 +1346,8 @@ class Unit(ABC):
             The damage and break damage pair
         source: Unit
             The source unit of the damage
-        tags: tuple
-            The list of all the tags attached to a damage\n
+        tags: Tags
+            The list of all the tags attached to a damage, interned (see tags.py)\n
             The first one is defined by the code that generated the DMG command ("Skill", "Basic ATK", etc.).
             The last one is always the damage type ("Physical", "Fire", etc.).
             Tags like "Follow-Up Attack" goes in the middle.
@@ -849,23 +1369,7 @@ class Unit(ABC):
                 data = ((self.decorated_self, tags[-1]),)
                 commands.append(("Break", source, data))
         if "Entanglement" in self.crowd_control:
-            debuff = {
-                "ID": "Entanglement",
-                "Type": "Crowd Control",
-                "DMG Type": "Quantum",
-                "Value Type": "Flat",
-                # the following fields with None are not needed for adding a stack
-                "Value": None,
-                "Source": None,
-                "Source Stats": None,
-                "Max Stack": 5,
-                "Stack": 1,
-                "Decay": "Start",
-                "Turn": 1,
-                "Unlock": "Start",
-                "Locked": True
-            }
-            self.decorated_self.add_debuff(debuff)
+            self.decorated_self.add_debuff(ENTANGLEMENT_STACK)
         return tuple(commands)
 
     def consume_hp(self, hp, source, enemies, players):
@@ -912,7 +1416,7 @@ class Unit(ABC):
         -------
         The modified healing amount
         """
-        return (1 + self.runtime_stats["Outgoing Healing Boost"]) * hp
+        return (1 + self.runtime_stats.array[Stat.OUTGOING_HEALING_BOOST]) * hp
 
     def amend_incoming_healing(self, hp, source, enemies, players):
         """
@@ -933,7 +1437,7 @@ class Unit(ABC):
         -------
         The modified healing amount
         """
-        return (1 + self.runtime_stats["Incoming Healing Boost"]) * hp
+        return (1 + self.runtime_stats.array[Stat.INCOMING_HEALING_BOOST]) * hp
 
     def take_healing(self, hp, source, enemies, players):
         """
@@ -959,3 +1463,68 @@ class Unit(ABC):
         if self.hp > self.runtime_stats["HP"]:
             self.hp = self.runtime_stats["HP"]
         return self.hp - original_hp
+
+
+def changes_speed_or_dmg_taken_decrease(type_name, buff_id):
+    """
+    Checks if a buff/debuff changes SPD or DMG Taken Decrease, whose effects can't be simply added and taken back.
+    """
+    return type_name == "SPD" or type_name == "DMG Taken Decrease" or buff_id == "Imprisonment"
+
+
+class OutdatedRuntimeStats(MutableMapping):
+    """
+    Stands in for the runtime_stats of a unit in lazy mode while they are out of date.\n
+    The first time it is used, it puts the unit's StatVector back, has the unit rebuild it and passes the call on. The
+    vector is rebuilt in place, so references to it stay valid.
+
+    Attributes:
+    ----------
+    unit: Unit
+        The unit whose stats are out of date
+    runtime_stats: StatVector
+        The unit's runtime_stats
+    """
+
+    def __init__(self, unit, runtime_stats):
+        self.unit = unit
+        self.runtime_stats = runtime_stats
+
+    def current(self):
+        """
+        Returns:
+        -------
+        The unit's runtime_stats, rebuilt if it is still out of date
+        """
+        unit = self.unit
+        if unit.runtime_stats is self:
+            unit.runtime_stats = self.runtime_stats
+            # the change was told when the stats were marked out of date
+            unit.decorated_self.rebuild_runtime_stats()
+        return self.runtime_stats
+
+    def __getitem__(self, key):
+        return self.current()[key]
+
+    def __setitem__(self, key, value):
+        self.current()[key] = value
+
+    def __delitem__(self, key):
+        del self.current()[key]
+
+    def __contains__(self, key):
+        return key in self.current()
+
+    def __iter__(self):
+        return iter(self.current())
+
+    def __len__(self):
+        return len(self.current())
+
+    @property
+    def array(self):
+        return self.current().array
+
+    @property
+    def version(self):
+        return self.current().version
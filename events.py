@@ -0,0 +1,253 @@
+# records for the commands/actions the units send to the operating system and the events written on the blackboard
+# every command type and action type is interned into a small integer code
+# so the system and the units can check the type of a record with an integer comparison, e.g. event.code == DMG
+# instead of comparing strings in nested tuples
+from bisect import bisect_left
+from collections.abc import Sequence
+
+# the name of each code, the code is the index
+EVENT_TYPES = []
+# the code of each name
+EVENT_CODES = {}
+
+
+def intern_event_type(name):
+    """
+    Finds the code of a command/action type, or assigns a new code if the type is new.
+
+    Parameters:
+    ----------
+    name: str
+        The command/action type, e.g. "DMG"
+
+    Returns:
+    -------
+    The code of the type
+    """
+    code = EVENT_CODES.get(name)
+    if code is None:
+        code = len(EVENT_TYPES)
+        EVENT_TYPES.append(name)
+        EVENT_CODES[name] = code
+    return code
+
+
+# command types
+DMG = intern_event_type("DMG")
+START_ATK = intern_event_type("Start ATK")
+END_ATK = intern_event_type("End ATK")
+LOSE_SP = intern_event_type("Lose SP")
+GAIN_SP = intern_event_type("Gain SP")
+BREAK = intern_event_type("Break")
+HEAL = intern_event_type("Heal")
+CONSUME_HP = intern_event_type("Consume HP")
+BUFF = intern_event_type("Buff")
+DEBUFF = intern_event_type("Debuff")
+ADVANCE = intern_event_type("Advance")
+DELAY = intern_event_type("Delay")
+REGENERATE_ENERGY = intern_event_type("Regenerate Energy")
+# action types
+BASIC_ATK = intern_event_type("Basic ATK")
+SKILL = intern_event_type("Skill")
+ULTIMATE = intern_event_type("Ultimate")
+TALENT = intern_event_type("Talent")
+PASS = intern_event_type("Pass")
+EXTRA_MOVE = intern_event_type("Extra Move")
+
+
+class Command:
+    """
+    A command or an action proposed by a unit.\n
+    It is the compact form of the (command_type: str, unit: Unit, data: Any) tuple. The operating system accepts both,
+    so characters that make tuples keep working.
+
+    Attributes:
+    ----------
+    code: int
+        The code of the command/action type
+    unit: Unit
+        The unit that proposes the command/action
+    data: Any
+        The data of the command, or the targets of the action
+    """
+
+    __slots__ = ("code", "unit", "data")
+
+    def __init__(self, code, unit, data):
+        self.code = code
+        self.unit = unit
+        self.data = data
+
+    @property
+    def type(self):
+        """
+        The name of the command/action type.
+        """
+        return EVENT_TYPES[self.code]
+
+
+class Event:
+    """
+    An entry on the blackboard.\n
+    For DMG, Heal, Consume HP, Debuff and Gain SP, data records the results (final damage, actual healing, etc.).
+    For the other commands, data is the data of the command, and for actions, it is the targets.
+
+    Attributes:
+    ----------
+    code: int
+        The code of the command/action type
+    unit: Unit
+        The unit that proposed the command/action
+    data: Any
+        The data of the event
+    readers: set
+        The units that signed to indicate they have read the event (None until someone signs)\n
+        Readers that only want the events they haven't seen yet should use Blackboard.read_new(.) instead.
+    """
+
+    __slots__ = ("code", "unit", "data", "readers")
+
+    def __init__(self, code, unit, data):
+        self.code = code
+        self.unit = unit
+        self.data = data
+        self.readers = None
+
+    @property
+    def type(self):
+        """
+        The name of the command/action type.
+        """
+        return EVENT_TYPES[self.code]
+
+    def sign(self, reader):
+        """
+        Signs the event to indicate the reader has read it.
+
+        Parameters:
+        ----------
+        reader: Unit
+            The unit who read the event
+        """
+        if self.readers is None:
+            self.readers = set()
+        self.readers.add(reader)
+
+    def is_signed_by(self, reader):
+        """
+        Checks if the reader has signed the event.
+
+        Parameters:
+        ----------
+        reader: Unit
+            The unit to be checked
+
+        Returns:
+        -------
+        True if the reader has read the event
+        """
+        return self.readers is not None and reader in self.readers
+
+
+class Blackboard(Sequence):
+    """
+    The events of the current turn in the order they were written, an append-only log.\n
+    Units can still iterate and index it like the list the blackboard used to be, but it is read-only for them.
+    Events are only added with append(.), which keeps the positions of the events of each type. With them and a read
+    cursor for each reader, a reader can get the events it hasn't seen yet, e.g. the new DMG events, without
+    rescanning the whole turn.
+
+    Attributes:
+    ----------
+    events: list
+        The events, in order
+    positions: dict
+        The positions of the events of each code, in order
+    cursors: dict
+        The position up to which each (reader, code) has read, see read_new(.)
+    """
+
+    def __init__(self):
+        self.events = []
+        self.positions = {}
+        self.cursors = {}
+
+    def __getitem__(self, index):
+        return self.events[index]
+
+    def __len__(self):
+        return len(self.events)
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def __contains__(self, event):
+        return event in self.events
+
+    def append(self, event):
+        """
+        Writes an event at the end of the log.
+
+        Parameters:
+        ----------
+        event: Event
+            The event
+        """
+        events = self.events
+        positions = self.positions.get(event.code)
+        if positions is None:
+            self.positions[event.code] = [len(events)]
+        else:
+            positions.append(len(events))
+        events.append(event)
+
+    def since(self, start, code=None):
+        """
+        Parameters:
+        ----------
+        start: int
+            The position to start from
+        code: int
+            The code of the events, None for all the events
+
+        Returns:
+        -------
+        A list of the events written at the position or after it, in order
+        """
+        events = self.events
+        if code is None:
+            return events[start:]
+        positions = self.positions.get(code)
+        if not positions or positions[-1] < start:
+            return []
+        return [events[i] for i in positions[bisect_left(positions, start):]]
+
+    def written_since(self, code, start):
+        """
+        Returns:
+        -------
+        True if an event of the code was written at the position start or after it
+        """
+        positions = self.positions.get(code)
+        return positions is not None and positions[-1] >= start
+
+    def read_new(self, reader, code=None):
+        """
+        Gets the events a reader hasn't read yet and moves its cursor to the end.\n
+        The cursors are kept for each code, so reading the new DMG events doesn't skip the other new events.
+
+        Parameters:
+        ----------
+        reader: Unit
+            The unit reading the blackboard
+        code: int
+            The code of the events, None for all the events
+
+        Returns:
+        -------
+        A list of the events written since the reader's last read_new(.) with the same code this turn
+        """
+        key = (reader, code)
+        start = self.cursors.get(key, 0)
+        self.cursors[key] = len(self.events)
+        return self.since(start, code)
@@ -17,6 +17,7 @@ class LightConeDecorator(Character, ABC):
     # the following code is here as a template
     # do not call any of these methods with super() in child classes, but do copy and paste the following code instead
     # otherwise you will mess up the double underscore name mangling
+    # keep @forwarder on the methods that only pass the call on, flattening skips them (see dispatch.py)
     @abstractmethod
     def __init__(self, decorated_character, hp, atk, def_, stack=1):
         self.__dict__ = decorated_character.__dict__
@@ -30,70 +31,87 @@ class LightConeDecorator(Character, ABC):
         self.hp = decorated_character.runtime_stats["HP"]
 
     @abstractmethod
+    @forwarder
     def choose_action(self, enemies, players, sp):
         return self.__decorated_character.choose_action(enemies, players, sp)
 
     @abstractmethod
+    @forwarder
     def check_extra_commands(self, enemies, players, blackboard):
         return self.__decorated_character.check_extra_commands(enemies, players, blackboard)
 
     @abstractmethod
+    @forwarder
     def check_extra_action(self, enemies, players, blackboard):
         return self.__decorated_character.check_extra_action(enemies, players, blackboard)
 
     @abstractmethod
+    @forwarder
     def check_extra_turn(self, enemies, players, sp, blackboard):
         return self.__decorated_character.check_extra_turn(enemies, players, sp, blackboard)
 
     @abstractmethod
+    @forwarder
     def start_turn(self):
         return self.__decorated_character.start_turn()
 
     @abstractmethod
+    @forwarder
     def take_action(self, enemies, players, sp):
         return self.__decorated_character.take_action(enemies, players, sp)
 
     @abstractmethod
+    @forwarder
     def end_turn(self):
         return self.__decorated_character.end_turn()
 
     @abstractmethod
+    @forwarder
     def add_buff(self, new_buff):
         return self.__decorated_character.add_buff(new_buff)
 
     @abstractmethod
+    @forwarder
     def add_debuff(self, new_debuff):
         return self.__decorated_character.add_debuff(new_debuff)
 
     @abstractmethod
+    @forwarder
     def amend_outgoing_effect_chance(self, chance, target, enemies, players):
         return self.__decorated_character.amend_outgoing_effect_chance(chance, target, enemies, players)
 
     @abstractmethod
+    @forwarder
     def amend_incoming_effect_chance(self, chance, debuff, source, enemies, players):
         return self.__decorated_character.amend_incoming_effect_chance(chance, debuff, source, enemies, players)
 
     @abstractmethod
+    @forwarder
     def maybe_add_debuff(self, chance, new_debuff):
         return self.__decorated_character.maybe_add_debuff(chance, new_debuff)
 
     @abstractmethod
+    @forwarder
     def dispel_buff(self, buff):
         return self.__decorated_character.dispel_buff(buff)
 
     @abstractmethod
+    @forwarder
     def dispel_debuff(self, debuff):
         return self.__decorated_character.dispel_debuff(debuff)
 
     @abstractmethod
+    @forwarder
     def unlock_buffs_debuffs(self, keyword):
         return self.__decorated_character.unlock_buffs_debuffs(keyword)
 
     @abstractmethod
+    @forwarder
     def refresh_runtime_stats(self):
         return self.__decorated_character.refresh_runtime_stats()
 
     @abstractmethod
+    @forwarder
     def start_atk(self, targets, enemies, players):
         return self.__decorated_character.start_atk(targets, enemies, players)
 
@@ -102,34 +120,42 @@ class LightConeDecorator(Character, ABC):
         return self.__decorated_character.end_dmg(targets, enemies, players)
 
     @abstractmethod
+    @forwarder
     def end_atk(self, targets, enemies, players):
         return self.__decorated_character.end_atk(targets, enemies, players)
 
     @abstractmethod
+    @forwarder
     def end_taking_atk(self, energy, enemies, players):
         return self.__decorated_character.end_taking_atk(energy, enemies, players)
 
     @abstractmethod
+    @forwarder
     def amend_outgoing_dmg(self, dmg_and_break, target, tags, enemies, players):
         return self.__decorated_character.amend_outgoing_dmg(dmg_and_break, target, tags, enemies, players)
 
     @abstractmethod
+    @forwarder
     def crit_dmg(self, dmg_and_break, target, tags, enemies, players, expected=True):
         return self.__decorated_character.crit_dmg(dmg_and_break, target, tags, enemies, players, expected)
 
     @abstractmethod
+    @forwarder
     def reduce_incoming_dmg(self, dmg_and_break, source, tags, enemies, players):
         return self.__decorated_character.reduce_incoming_dmg(dmg_and_break, source, tags, enemies, players)
 
     @abstractmethod
+    @forwarder
     def take_dmg(self, dmg_and_break, source, tags, enemies, players):
         return self.__decorated_character.take_dmg(dmg_and_break, source, tags, enemies, players)
 
     @abstractmethod
+    @forwarder
     def consume_hp(self, hp, source, enemies, players):
         return self.__decorated_character.consume_hp(hp, source, enemies, players)
 
     @abstractmethod
+    @forwarder
     def amend_outgoing_healing(self, hp, target, enemies, players):
         return self.__decorated_character.amend_outgoing_healing(hp, target, enemies, players)
 
@@ -138,25 +164,31 @@ class LightConeDecorator(Character, ABC):
         return self.__decorated_character.amend_incoming_healing(hp, target, enemies, players)
 
     @abstractmethod
+    @forwarder
     def take_healing(self, hp, source, enemies, players):
         return self.__decorated_character.take_healing(hp, source, enemies, players)
 
     @abstractmethod
+    @forwarder
     def try_activate_ult(self, enemies, players):
         return self.__decorated_character.try_activate_ult(enemies, players)
 
     @abstractmethod
+    @forwarder
     def basic_atk(self, targets, step):
         return self.__decorated_character.basic_atk(targets, step)
 
     @abstractmethod
+    @forwarder
     def skill(self, targets, step):
         return self.__decorated_character.skill(targets, step)
 
     @abstractmethod
+    @forwarder
     def ultimate(self, targets, step):
         return self.__decorated_character.ultimate(targets, step)
 
     @abstractmethod
+    @forwarder
     def talent(self, targets, step):
         return self.__decorated_character.talent(targets, step)
@@ -23,109 +23,139 @@ class TheUnreachableSide(LightConeDecorator):
         if self.__active:
             self.__active = False
             self.stats["DMG Boost"]["All"] -= self.__dmg_boost
-            self.__decorated_character.refresh_runtime_stats()
+            self.__decorated_character.invalidate_runtime_stats()
         return self.__decorated_character.end_atk(targets, enemies, players)
 
     def take_dmg(self, dmg_and_break, source, tags, enemies, players):
         if not self.__active:
             self.__active = True
             self.stats["DMG Boost"]["All"] += self.__dmg_boost
-            self.__decorated_character.refresh_runtime_stats()
+            self.__decorated_character.invalidate_runtime_stats()
         return self.__decorated_character.take_dmg(dmg_and_break, source, tags, enemies, players)
 
     def consume_hp(self, hp, source, enemies, players):
         if not self.__active:
             self.__active = True
             self.stats["DMG Boost"]["All"] += self.__dmg_boost
-            self.__decorated_character.refresh_runtime_stats()
+            self.__decorated_character.invalidate_runtime_stats()
         return self.__decorated_character.consume_hp(hp, source, enemies, players)
 
+    @forwarder
     def choose_action(self, enemies, players, sp):
         return self.__decorated_character.choose_action(enemies, players, sp)
 
+    @forwarder
     def check_extra_commands(self, enemies, players, blackboard):
         return self.__decorated_character.check_extra_commands(enemies, players, blackboard)
 
+    @forwarder
     def check_extra_action(self, enemies, players, blackboard):
         return self.__decorated_character.check_extra_action(enemies, players, blackboard)
 
+    @forwarder
     def check_extra_turn(self, enemies, players, sp, blackboard):
         return self.__decorated_character.check_extra_turn(enemies, players, sp, blackboard)
 
+    @forwarder
     def start_turn(self):
         return self.__decorated_character.start_turn()
 
+    @forwarder
     def take_action(self, enemies, players, sp):
         return self.__decorated_character.take_action(enemies, players, sp)
 
+    @forwarder
     def end_turn(self):
         return self.__decorated_character.end_turn()
 
+    @forwarder
     def add_buff(self, new_buff):
         return self.__decorated_character.add_buff(new_buff)
 
+    @forwarder
     def add_debuff(self, new_debuff):
         return self.__decorated_character.add_debuff(new_debuff)
 
+    @forwarder
     def amend_outgoing_effect_chance(self, chance, target, enemies, players):
         return self.__decorated_character.amend_outgoing_effect_chance(chance, target, enemies, players)
 
+    @forwarder
     def amend_incoming_effect_chance(self, chance, debuff, source, enemies, players):
         return self.__decorated_character.amend_incoming_effect_chance(chance, debuff, source, enemies, players)
 
+    @forwarder
     def maybe_add_debuff(self, chance, new_debuff):
         return self.__decorated_character.maybe_add_debuff(chance, new_debuff)
 
+    @forwarder
     def dispel_buff(self, buff):
         return self.__decorated_character.dispel_buff(buff)
 
+    @forwarder
     def dispel_debuff(self, debuff):
         return self.__decorated_character.dispel_debuff(debuff)
 
+    @forwarder
     def unlock_buffs_debuffs(self, keyword):
         return self.__decorated_character.unlock_buffs_debuffs(keyword)
 
+    @forwarder
     def refresh_runtime_stats(self):
         return self.__decorated_character.refresh_runtime_stats()
 
+    @forwarder
     def start_atk(self, targets, enemies, players):
         return self.__decorated_character.start_atk(targets, enemies, players)
 
+    @forwarder
     def end_dmg(self, data, enemies, players):
         return self.__decorated_character.end_dmg(data, enemies, players)
 
+    @forwarder
     def end_taking_atk(self, energy, enemies, players):
         return self.__decorated_character.end_taking_atk(energy, enemies, players)
 
+    @forwarder
     def amend_outgoing_dmg(self, dmg_and_break, target, tags, enemies, players):
         return self.__decorated_character.amend_outgoing_dmg(dmg_and_break, target, tags, enemies, players)
 
+    @forwarder
     def crit_dmg(self, dmg_and_break, target, tags, enemies, players, expected=True):
         return self.__decorated_character.crit_dmg(dmg_and_break, target, tags, enemies, players, expected)
 
+    @forwarder
     def reduce_incoming_dmg(self, dmg_and_break, source, tags, enemies, players):
         return self.__decorated_character.reduce_incoming_dmg(dmg_and_break, source, tags, enemies, players)
 
+    @forwarder
     def amend_outgoing_healing(self, hp, target, enemies, players):
         return self.__decorated_character.amend_outgoing_healing(hp, target, enemies, players)
 
+    @forwarder
     def amend_incoming_healing(self, hp, source, enemies, players):
         return self.__decorated_character.amend_incoming_healing(hp, source, enemies, players)
 
+    @forwarder
     def take_healing(self, hp, source, enemies, players):
         return self.__decorated_character.take_healing(hp, source, enemies, players)
 
+    @forwarder
     def try_activate_ult(self, enemies, players):
         return self.__decorated_character.try_activate_ult(enemies, players)
 
+    @forwarder
     def basic_atk(self, targets, step):
         return self.__decorated_character.basic_atk(targets, step)
 
+    @forwarder
     def skill(self, targets, step):
         return self.__decorated_character.skill(targets, step)
 
+    @forwarder
     def ultimate(self, targets, step):
         return self.__decorated_character.ultimate(targets, step)
 
+    @forwarder
     def talent(self, targets, step):
         return self.__decorated_character.talent(targets, step)
@@ -1,5 +1,88 @@
 from characters import *
+from action_queue import *
+from events import *
+from battle_log import *
+from battle_trace import *
 from sys import stdout
+from random import Random
+from hashlib import sha256
+from types import GeneratorType
+
+# what next(.) returns in run_commands(.) once a batch or a handler is done, None may be a value
+_DONE = object()
+
+
+def step_action(method_name):
+    """
+    Makes an action handler that orders the unit to take the action step by step.\n
+    Some actions take many steps such as Welt's skill inflicting 3 hits.
+    We can't just merge them into one because later steps might depend on the results from the previous steps.
+    So the system has to go back and forth and call the unit's method in a loop until the unit says it's done.
+    The step count is passed to the unit so the unit knows where they are.
+
+    Parameters:
+    ----------
+    method_name: str
+        The name of the unit's method that defines the action, e.g. "basic_atk"
+
+    Returns:
+    -------
+    A function handler(system, unit, targets)
+    """
+    def run_steps(system, unit, targets):
+        method = getattr(unit, method_name)
+        done = False
+        step = 0
+        while not done:
+            step += 1
+            commands, done = method(targets, step)
+            system.run_commands(commands)
+    return run_steps
+
+
+def battle_seed(seed, index):
+    """
+    Derives the seed of one battle in a batch of battles.\n
+    Seeding battles with seed, seed + 1, etc. gives streams that are only different in name. The derived seeds are
+    hashed, so the battles get independent streams and any single battle can be reproduced from (seed, index).
+
+    Parameters:
+    ----------
+    seed: int
+        The seed of the whole batch
+    index: int
+        The index of the battle in the batch
+
+    Returns:
+    -------
+    The seed of the battle
+    """
+    return int.from_bytes(sha256((str(seed) + ":" + str(index)).encode()).digest(), "big")
+
+
+# the battle log formats these lines only when their verbosity level is enabled
+def format_turn(time_passed, sp):
+    return "At time step " + str(round(time_passed, 1)) + ": SP = " + str(sp) + "\n"
+
+
+def format_action(unit, action_type, targets):
+    return unit.name + " uses " + action_type + " on " + " ".join([t.name for t in targets]) + "\n"
+
+
+def format_dmg(target, dmg):
+    return "  " + target.name + " takes " + str(round(dmg)) + " DMG"
+
+
+def format_break(target):
+    return "  " + target.name + " breaks"
+
+
+def format_heal(target, hp):
+    return "  " + target.name + " restores " + str(round(hp)) + " HP"
+
+
+def format_consume_hp(target, hp):
+    return "  " + target.name + " consumes " + str(round(hp)) + " HP"
 
 
 class RailOperatingSystem:
@@ -22,83 +105,174 @@ class RailOperatingSystem:
     auto_heal_mode: bool
         Whether the units will restore to full health after taking damage
     show_action: bool
-        Whether to show the units' actions on the screen
-    battle_log: str
-        The transcript of the battle
+        Whether to show the units' actions on the screen when no battle log is given
+    battle_log: BattleLog
+        Where the transcript of the battle is written, see battle_log.py
+    trace: TraceRecorder
+        Records every event of the battle to a binary file (None to record nothing), see battle_trace.py
+    seed: int
+        The seed of the battle's random number generator, pass it back to reproduce the battle
+    rng: Random
+        The random number generator shared by all units in the battle
+    lazy_runtime_stats: bool
+        Whether the units rebuild their runtime stats only when they are read, see Unit.lazy_runtime_stats
+    flatten: bool
+        Whether the decorators of the units are flattened for the battle, see flatten_decorators(.)\n
+        They are put back when the battle ends, see end(.).
+    ended: bool
+        Whether end(.) has been called
+    default_outgoing_dmg: set
+        The units that don't override amend_outgoing_dmg(.) or crit_dmg(.), see run_dmg(.)
+    default_incoming_dmg: set
+        The units that don't override reduce_incoming_dmg(.)
+    ult_candidates: set
+        The players with enough energy to use ultimate, only they are asked in check_ult(.), see Unit.ult_energy_cost
+    extra_turn_requests: set
+        The units that asked for an extra turn with Unit.request_extra_turn(.), shared by all the units
+    extra_turn_pollers: set
+        The units that override check_extra_turn(.) without requesting extra turns, they are asked every time
     sp: int
         How many skill points the player has
     sp_cap: int
         The max skill points the player can have
     time_passed: float
         Keeps track of how much time has passed in the battle
-    distances: dict
-        A dictionary that records the distance from each unit to the endpoint
-    queue: list
-        A sorted list of (time: float, unit: Unit) representing the time left for the unit to start its next turn
-    blackboard: list
-        A list of all the events happened this turn\n
-        Used as a broadcasting tool for action information.
+    queue: ActionQueue
+        A priority queue of the units ordered by the time they start their next turn
+    distances: DistanceView
+        A dictionary-like view that records the distance from each unit to the endpoint
+    blackboard: Blackboard
+        The events that happened this turn in order (Event records), see Blackboard in events.py\n
+        Used as a broadcasting tool for action information, the units can read it but not change it.
         e.g. if a unit does follow-up attacks after a teammate, it needs to know if someone took the attack action.
-        A set where units can sign to indicate they have read the message is also added to each entry.
+        Units can ask it for the events they haven't read yet.
+    extra_commands_subscribers: dict
+        The units to be checked for extra commands after each event code, see Unit.subscribe_extra_commands(.)
+    extra_action_subscribers: dict
+        The units to be checked for extra actions after each event code, see Unit.subscribe_extra_action(.)
+    command_handlers: dict
+        The function that executes each command code (shared by all systems), see register_command_type(.)
+    action_handlers: dict
+        The function that runs each action code (shared by all systems), see register_action_type(.)
     """
 
-    def __init__(self, enemies, players, battle_length=850, auto_heal_mode=False, show_action=False):
+    def __init__(
+            self, enemies, players, battle_length=850, auto_heal_mode=False, show_action=False, battle_log=None,
+            trace=None, seed=None, lazy_runtime_stats=False, flatten=True
+    ):
         self.enemies = enemies
         self.players = players
         self.battle_length = battle_length
         self.auto_heal_mode = auto_heal_mode
         self.show_action = show_action
-        self.battle_log = ""
+        if battle_log is None:
+            # by default, the whole transcript is shown at the end of the battle
+            battle_log = BufferedLog(DETAILS, stdout) if show_action else NullLog()
+        self.battle_log = battle_log
+        self.trace = trace
+        # every battle has its own generator, so battles can run side by side and each one can be reproduced
+        if seed is None:
+            seed = Random().getrandbits(64)
+        self.seed = seed
+        self.rng = Random(seed)
+        self.lazy_runtime_stats = lazy_runtime_stats
+        self.flatten = flatten
+        self.ended = False
         self.sp = 3
         self.sp_cap = 5
         self.time_passed = 0
         units = enemies + players
-        self.queue = []
-        self.distances = {unit: 10000 for unit in units}
-        self.blackboard = []
-        # put all the units into the queue and assign time and distance
         for unit in units:
-            # basic math, time = distance/speed
-            time = self.distances[unit] / unit.runtime_stats["SPD"]
-            self.queue.append([time, unit])
-        # sort them by time so the first in the queue is the unit that moves next
-        self.queue.sort(key=lambda x: x[0])
+            unit.rng = self.rng
+            unit.lazy_runtime_stats = lazy_runtime_stats
+            if flatten:
+                flatten_decorators(unit)
+        # the units put their extra turn requests in one set, the ones that don't are asked every time
+        self.extra_turn_requests = set()
+        self.extra_turn_pollers = set()
+        for unit in units:
+            # keep the requests made before the battle
+            self.extra_turn_requests.update(unit.extra_turn_requests)
+            unit.extra_turn_requests = self.extra_turn_requests
+            if not unit.requests_extra_turns and resolve_method(unit, "check_extra_turn") is not Unit.check_extra_turn:
+                self.extra_turn_pollers.add(unit)
+        # the players share one index of who has enough energy to use ultimate
+        self.ult_candidates = set()
+        for unit in players:
+            unit.ult_candidates = self.ult_candidates
+            unit.energy = unit.energy
+        # the damage of a DMG command with many targets is resolved in one pass when the hooks aren't overridden
+        self.default_outgoing_dmg = set()
+        self.default_incoming_dmg = set()
+        for unit in units:
+            hooks = (resolve_method(unit, "amend_outgoing_dmg"), resolve_method(unit, "crit_dmg"))
+            if hooks == (Unit.amend_outgoing_dmg, Unit.crit_dmg):
+                self.default_outgoing_dmg.add(unit)
+            if resolve_method(unit, "reduce_incoming_dmg") is Unit.reduce_incoming_dmg:
+                self.default_incoming_dmg.add(unit)
+        self.blackboard = Blackboard()
+        # put all the units into the queue 10,000 away from the endpoint
+        # the first in the queue is the unit that moves next
+        self.queue = ActionQueue(units, 10000)
+        # the units of each side share one table for being picked as targets by Taunt
+        TauntTable().rebuild(players)
+        TauntTable().rebuild(enemies)
+        # the units tell the queue when their runtime stats change, so it doesn't poll everyone's speed
+        for unit in units:
+            unit.stat_changes = self.queue.stat_changes
+        # the distances are computed from the queue's clock when they are read
+        self.distances = DistanceView(self.queue, lambda: self.time_passed)
+        # only the units that subscribe to an event will be checked for extra commands/actions after it happens
+        self.extra_commands_subscribers = {}
+        self.extra_action_subscribers = {}
+        # "All" is kept as it is, the other types are looked up by their codes
+        for unit in units:
+            commands_events = unit.extra_commands_events
+            # a unit that checks for extra commands/actions without subscribing is checked after every event
+            if not commands_events and resolve_method(unit, "check_extra_commands") is not Unit.check_extra_commands:
+                commands_events = ("All",)
+            action_events = unit.extra_action_events
+            if not action_events and resolve_method(unit, "check_extra_action") is not Unit.check_extra_action:
+                action_events = ("All",)
+            for event_type in commands_events:
+                key = event_type if event_type == "All" else intern_event_type(event_type)
+                self.extra_commands_subscribers.setdefault(key, set()).add(unit)
+            for event_type in action_events:
+                key = event_type if event_type == "All" else intern_event_type(event_type)
+                self.extra_action_subscribers.setdefault(key, set()).add(unit)
 
     def tic(self):
         """
         Proceeds with the game. Pick up the next unit and resolve its turn, then update the queue.
+        The battle is ended with end(.) when it runs out of time or a turn raises an exception.
 
         Returns:
         -------
         True if the game is still running or False if it ends
         """
-        # find the first unit in the queue and how much time it takes to start its next turn, then pass that much time
-        time, next_unit = self.queue[0]
-        self.time_passed += time
+        # find the first unit in the queue and when it starts its next turn, then pass that much time
+        # the other units don't need to be moved, the queue computes their distances when needed
+        arrival, next_unit = self.queue.peek()
+        self.time_passed = arrival
         if self.time_passed > self.battle_length:
+            self.end()
             return False
-        # pass that much time for every unit in the queue and compute the new distance for them
-        for time_and_unit in self.queue:
-            time_and_unit[0] -= time
-            unit = time_and_unit[1]
-            # basic math, distance = speed*time
-            self.distances[unit] -= unit.runtime_stats["SPD"] * time
         # resolve the turn
-        self.run_turn(next_unit)
-        # update the time in the queue since there are potential speed changes then sort the queue by time
-        for time_and_unit in self.queue:
-            unit = time_and_unit[1]
-            # basic math, time = distance/speed
-            time_and_unit[0] = self.distances[unit] / unit.runtime_stats["SPD"]
-        self.queue.sort(key=lambda x: x[0])
+        try:
+            self.run_turn(next_unit)
+        except BaseException:
+            # don't leave the caller's units flattened
+            self.end()
+            raise
+        # reschedule the units that were moved or had their speed changed during the turn
+        self.queue.update(self.time_passed)
         return True
 
     def run_turn(self, unit):
         """
         Resolve the next unit's turn, then resolve extra turns if any.
         """
-        if self.show_action:
-            self.battle_log += "At time step " + str(round(self.time_passed, 1)) + ": SP = " + str(self.sp) + "\n"
+        self.battle_log.format(TURNS, format_turn, self.time_passed, self.sp)
         # resolve the turn and put the unit back to the starting position (10,000 away)
         self.run_commands(unit.start_turn())
         # different units have different ways to resolve turns
@@ -126,9 +300,8 @@ class RailOperatingSystem:
         self.distances[unit] = 10000
         self.run_commands(unit.end_turn())
         # erase blackboard
-        self.blackboard = []
-        if self.show_action:
-            self.battle_log += "\n"
+        self.blackboard = Blackboard()
+        self.battle_log.write(TURNS, "\n")
 
     def run_action(self, action):
         """
@@ -139,69 +312,47 @@ class RailOperatingSystem:
         action: tuple
             The action to be run\n
             An action is a requirement of some unit to perform an action such as basic attack on some targets.
-            It is a tuple in the form (action_type: str, unit: Unit, targets: tuple).
-            e.g. ("Skill", character, (enemy1, enemy2, enemy3)).
+            It is a tuple in the form (action_type: str, unit: Unit, targets: tuple), or a Command record.
+            e.g. ("Skill", character, (enemy1, enemy2, enemy3)) or Command(SKILL, character, (enemy1, enemy2, enemy3)).
             The first one in the targets tuple is always the main target.
             The operating system orders the unit to take action on the targets and receive a batch of commands.
             The commands returned by the unit tell the system what it truly does, such as dealing dmg or healing.
             The system then executes the commands.
             (use tuples for immutability and safety).
         """
-        self.blackboard.append((action, set()))
-        # check for the action type and targets then order the unit to perform the action on the targets
-        # the unit then returns a bunch of commands to be executed
-        action_type, unit, targets = action
-        if self.show_action:
-            self.battle_log += unit.name + " uses " + action_type + " on " + " ".join([t.name for t in targets]) + "\n"
-        done = False
-        step = 0
-        # types are ordered roughly from most frequent to least frequent for better efficiency
-        if action_type == "Basic ATK":
-            # some actions take many steps such as Welt's skill inflicting 3 hits
-            # can't just merge them into one because later steps might depend on the results from the previous steps
-            # so the system has to go back and forth and call the unit's method in a loop until the unit says it's done
-            # pass the step count to the unit so the unit knows where they are
-            while not done:
-                step += 1
-                commands, done = unit.basic_atk(targets, step)
-                self.run_commands(commands)
-        elif action_type == "Skill":
-            while not done:
-                step += 1
-                commands, done = unit.skill(targets, step)
-                self.run_commands(commands)
-        elif action_type == "Ultimate":
-            while not done:
-                step += 1
-                commands, done = unit.ultimate(targets, step)
-                self.run_commands(commands)
-        elif action_type == "Talent":
-            while not done:
-                step += 1
-                commands, done = unit.talent(targets, step)
-                self.run_commands(commands)
-        # skips a turn (frozen, etc.)
-        elif action_type == "Pass":
-            pass
-        # most units won't have this action
-        elif action_type == "Extra Move":
-            while not done:
-                step += 1
-                commands, done = unit.extra_move(targets, step)
-                self.run_commands(commands)
-        else:
-            raise TypeError("unknown action type " + action_type)
-        # check if anyone needs to take extra action
-        # e.g.Clara's counterattack is an action ("Talent", targets)
-        # recursively resolve all extra actions, because extra actions may cause more extra actions
-        for time_and_unit in self.queue:
-            unit = time_and_unit[1]
-            if not unit.crowd_control:
-                action = unit.check_extra_action(self.enemies, self.players, self.blackboard)
-                if action:
-                    self.run_action(action)
-                    break
-                    # break here because the recursion already resolves all units' extra actions
+        # an extra action is run after the action that caused it, so a chain of extra actions is a loop
+        # the whole chain is scanned from where it started, so the subscribers triggered by an earlier action are
+        # still asked after the first of them takes its extra action
+        start = len(self.blackboard)
+        while action:
+            if type(action) is tuple:
+                # units may still propose actions as tuples
+                action_type, unit, targets = action
+                code = EVENT_CODES.get(action_type)
+            else:
+                action_type = action.type
+                code, unit, targets = action.code, action.unit, action.data
+            # look up how to run this type of action, see register_action_type(.)
+            handler = self.action_handlers.get(code)
+            if handler is None:
+                raise TypeError("unknown action type " + action_type)
+            self.broadcast(code, unit, targets)
+            self.battle_log.format(ACTIONS, format_action, unit, action_type, targets)
+            # order the unit to perform the action on the targets
+            # the unit then returns a bunch of commands to be executed
+            handler(self, unit, targets)
+            # check if anyone needs to take extra action
+            # e.g.Clara's counterattack is an action ("Talent", targets)
+            # the first unit that takes one ends the scan, its action may cause more extra actions
+            action = None
+            subscribers = self.find_subscribers(self.extra_action_subscribers, start)
+            if not subscribers:
+                return
+            for unit in self.queue.units():
+                if unit in subscribers and not unit.crowd_control:
+                    action = unit.check_extra_action(self.enemies, self.players, self.blackboard)
+                    if action:
+                        break
 
     def run_commands(self, commands):
         """
@@ -210,153 +361,349 @@ class RailOperatingSystem:
         Parameters:
         ----------
         commands: tuple
-            A batch of commands where each command is a tuple in the form (command_type: str, unit: Unit, data: Any)\n
+            A batch of commands where each command is a tuple in the form (command_type: str, unit: Unit, data: Any)
+            or a Command record\n
             data is a tuple or some value depending on command_type.
             A command is something that needs to be done by the operating system, such as dealing dmg, healing, etc.
         """
-        for command in commands:
-            command_type, unit, data = command
-            # types are ordered roughly from most frequent to least frequent for better efficiency
-            if command_type == "DMG":
-                # DMG messages record final damage and have an additional entry indicating whether it critically hits
-                message_data = []
-                # units might generate commands such as weakness break when taking dmg
-                command_batches = []
-                # a dmg command looks like ("DMG", unit, data)
-                # where data is ((target1, (dmg1, break_dmg1), tags1), (target2, (dmg2, break_dmg2), tags2), ...)
-                # it can apply dmg to many targets each with different dmg
-                for target, dmg_and_break, tags in data:
-                    # it's divided into many steps so special effects can be applied at each step
-                    # calculate amended dmg with the attacker's dmg increase, crit, etc.
-                    dmg_and_break = unit.amend_outgoing_dmg(dmg_and_break, target, tags, self.enemies, self.players)
-                    # calculate crit dmg (expected dmg by default)
-                    dmg_and_break, crit = unit.crit_dmg(dmg_and_break, target, tags, self.enemies, self.players)
-                    # calculate final dmg with the target's defence, resistance, etc.
-                    dmg_and_break = target.reduce_incoming_dmg(dmg_and_break, unit, tags, self.enemies, self.players)
-                    # record the dmg
-                    dmg, break_dmg = dmg_and_break
-                    tag_str = " ".join(tags)
-                    if tag_str in unit.dmg_dealt_record:
-                        unit.dmg_dealt_record[tag_str] += dmg
-                        unit.break_dmg_dealt_record[tag_str] += break_dmg
-                    else:
-                        unit.dmg_dealt_record[tag_str] = dmg
-                        unit.break_dmg_dealt_record[tag_str] = break_dmg
-                    message_data.append((target, dmg_and_break, tags, crit))
-                    if self.show_action:
-                        self.battle_log += "  " + target.name + " takes " + str(round(dmg)) + " DMG"
-                    # take the dmg
-                    command_batches.append(target.take_dmg(dmg_and_break, unit, tags, self.enemies, self.players))
-                    if self.auto_heal_mode:
-                        target.hp = target.runtime_stats["HP"]
-                if self.show_action:
-                    self.battle_log += "\n"
-                message_data = tuple(message_data)
-                message = (command_type, unit, message_data)
-                self.blackboard.append(message)
-                self.run_commands(unit.end_dmg(message_data, self.players, self.enemies))
-                for commands in command_batches:
-                    self.run_commands(commands)
-            elif command_type == "Start ATK":
-                self.blackboard.append((command, set()))
-                self.run_commands(unit.start_atk(data, self.enemies, self.players))
-            elif command_type == "End ATK":
-                self.blackboard.append((command, set()))
-                self.run_commands(unit.end_atk(data, self.enemies, self.players))
-                for target in data:
-                    energy_restore = 10
-                    self.run_commands(target.end_taking_atk(energy_restore, self.enemies, self.players))
-            elif command_type == "Lose SP":
-                self.blackboard.append((command, set()))
-                self.sp -= data
-                if self.sp < 0:
-                    raise ValueError("skill points less than 0")
-            elif command_type == "Gain SP":
-                original_sp = self.sp
-                self.sp += data
-                if self.sp > self.sp_cap:
-                    self.sp = self.sp_cap
-                actual_sp_gained = self.sp - original_sp
-                if actual_sp_gained:
-                    message = (command_type, unit, actual_sp_gained)
-                    self.blackboard.append((message, set()))
-            elif command_type == "Break":
-                self.blackboard.append((command, set()))
-                for target, dmg_type in data:
-                    if self.show_action:
-                        self.battle_log += "  " + target.name + " breaks"
-                    self.run_commands(target.weakness_break(dmg_type, unit, self.enemies, self.players))
-            elif command_type == "Heal":
-                # the messages record actual healing (not counting excess healing)
-                message_data = []
-                for target, hp, in data:
-                    hp = unit.amend_outgoing_healing(hp, target, self.enemies, self.players)
-                    hp = unit.amend_incoming_healing(hp, target, self.enemies, self.players)
-                    hp = target.take_healing(hp, unit, self.enemies, self.players)
-                    message_data.append((target, hp))
-                    if self.show_action:
-                        self.battle_log += "  " + target.name + " restores " + str(round(hp)) + " HP"
-                if self.show_action:
-                    self.battle_log += "\n"
-                message_data = tuple(message_data)
-                message = (command_type, unit, message_data)
-                self.blackboard.append(message)
-            elif command_type == "Consume HP":
-                # the messages record actual consumption (can't go below 1 HP)
-                message_data = []
-                for target, hp, in data:
-                    hp = target.consume_hp(hp, unit, self.enemies, self.players)
-                    if self.auto_heal_mode:
-                        target.hp = target.runtime_stats["HP"]
-                    if self.show_action:
-                        self.battle_log += "  " + target.name + " consumes " + str(round(hp)) + " HP"
-                    message_data.append((target, hp))
-                if self.show_action:
-                    self.battle_log += "\n"
-                message_data = tuple(message_data)
-                message = (command_type, unit, message_data)
-                self.blackboard.append(message)
-            elif command_type == "Buff":
-                self.blackboard.append((command, set()))
-                for target, buff in data:
-                    target.add_buff(buff)
-            elif command_type == "Debuff":
-                # the messages record successfully applied debuffs
-                message_data = []
-                for target, chance, debuff in data:
-                    chance = unit.amend_outgoing_effect_chance(chance, target, self.enemies, self.players)
-                    chance = target.amend_incoming_effect_chance(chance, debuff, unit, self.enemies, self.players)
-                    if target.maybe_add_debuff(chance, debuff):
-                        message_data.append((target, debuff))
-                message_data = tuple(message_data)
-                message = (command_type, unit, message_data)
-                self.blackboard.append(message)
-            elif command_type == "Advance":
-                self.blackboard.append((command, set()))
-                for target, percentage, in data:
-                    self.distances[target] -= percentage * 10000
-                    if self.distances[target] < 0:
-                        self.distances[target] = 0
-            elif command_type == "Delay":
-                self.blackboard.append((command, set()))
-                for target, percentage, in data:
-                    self.distances[target] += percentage * 10000
-            elif command_type == "Regenerate Energy":
-                self.blackboard.append((command, set()))
-                for target, energy, in data:
-                    target.energy += energy
+        # the commands that cause more commands (end_dmg(.) effects, breaks, extra commands, etc.) don't call this
+        # method again, they go on a work stack, so long chains of follow-ups don't nest Python calls
+        # each entry is either a batch [iterator over the commands, blackboard position its extra commands scan from]
+        # or a handler that is still running (a generator that yields the batches it wants executed)
+        # the top entry runs until it is done, so a batch that a handler yields is fully executed, extra commands
+        # included, before the handler goes on, just like a recursive call
+        handlers = self.command_handlers
+        stack = [[iter(commands), len(self.blackboard)]]
+        while stack:
+            frame = stack[-1]
+            if type(frame) is not list:
+                # a handler in the middle of its work
+                commands = next(frame, _DONE)
+                if commands is _DONE:
+                    stack.pop()
+                elif commands is not None:
+                    # a hook with nothing to do may return None, the handler still has its other batches to yield
+                    stack.append([iter(commands), len(self.blackboard)])
+                continue
+            command = next(frame[0], _DONE)
+            if command is not _DONE:
+                if type(command) is tuple:
+                    # most characters still propose commands as tuples
+                    command_type, unit, data = command
+                    code = EVENT_CODES.get(command_type)
+                else:
+                    code, unit, data = command.code, command.unit, command.data
+                # look up how to execute this type of command, see register_command_type(.)
+                handler = handlers.get(code)
+                if handler is None:
+                    raise TypeError("unknown command type " + (EVENT_TYPES[code] if code is not None else command[0]))
+                result = handler(self, unit, data)
+                if result is not None:
+                    if type(result) is not GeneratorType:
+                        raise TypeError(
+                            "the handler of " + EVENT_TYPES[code] + " commands returned " + type(result).__name__
+                            + " instead of None or a generator of batches"
+                        )
+                    stack.append(result)
+                continue
+            # the batch is done
+            stack.pop()
+            # check if any character wants to run extra commands and executes them
+            # e.g. Luocha's passive healing from his trace "Sanctified" is an extra command
+            # the first unit that has some ends the scan, its commands are a new batch which may cause more of them
+            subscribers = self.find_subscribers(self.extra_commands_subscribers, frame[1])
+            if not subscribers:
+                continue
+            for unit in self.queue.units():
+                if unit not in subscribers:
+                    continue
+                commands = unit.check_extra_commands(self.enemies, self.players, self.blackboard)
+                if commands:
+                    # the extra batch is scanned from where the batch that caused it started, so the other units
+                    # triggered by that batch are still asked once it is done
+                    stack.append([iter(commands), frame[1]])
+                    break
+
+    @classmethod
+    def register_action_type(cls, action_type, handler):
+        """
+        Teaches the operating system a new type of action, or replaces how an existing type is run.
+
+        Parameters:
+        ----------
+        action_type: str
+            The action type, e.g. "Summon Move"
+        handler: function
+            A function handler(system, unit, targets) that orders the unit to take the action and runs the commands\n
+            Use step_action(.) for actions that call a unit method step by step like "Basic ATK" does.
+
+        Returns:
+        -------
+        The code of the action type
+        """
+        code = intern_event_type(action_type)
+        cls.action_handlers[code] = handler
+        return code
+
+    @classmethod
+    def register_command_type(cls, command_type, handler):
+        """
+        Teaches the operating system a new type of command, or replaces how an existing type is executed.
+
+        Parameters:
+        ----------
+        command_type: str
+            The command type, e.g. "Shield"
+        handler: function
+            A function handler(system, unit, data) that executes the command\n
+            It should write the command (or its results) on the blackboard with system.broadcast(.)
+            so that other units can react to it. A handler that causes more commands can be a generator that
+            yields the batches to execute (see run_commands(.)), or call system.run_commands(.) itself. Anything
+            else it returns other than None is a TypeError.
+
+        Returns:
+        -------
+        The code of the command type
+        """
+        code = intern_event_type(command_type)
+        cls.command_handlers[code] = handler
+        return code
+
+    def run_dmg(self, unit, data):
+        """
+        Deals damage to the targets and records it.
+        """
+        # DMG messages record final damage and have an additional entry indicating whether it critically hits
+        message_data = []
+        # units might generate commands such as weakness break when taking dmg
+        command_batches = []
+        # a dmg command looks like ("DMG", unit, data)
+        # where data is ((target1, (dmg1, break_dmg1), tags1), (target2, (dmg2, break_dmg2), tags2), ...)
+        # it can apply dmg to many targets each with different dmg
+        dmg_dealt_by_tags = unit.dmg_dealt_by_tags
+        break_dmg_dealt_by_tags = unit.break_dmg_dealt_by_tags
+        # AoE and blast attacks hit many targets with the same tags
+        # when the hooks aren't overridden, the attacker's side is computed once and each target only adds its side
+        batched = len(data) > 1 and unit in self.default_outgoing_dmg
+        if batched:
+            # the attacker's side is the same for all the targets unless a conditional modifier looks at the target
+            reusable = not unit.has_target_conditions()
+            outgoing_key = None
+            outgoing = 1
+        for target, dmg_and_break, tags in data:
+            if type(tags) is not Tags:
+                # the tags of a command made with a plain tuple
+                tags = intern_tags(*tags)
+            if batched and target in self.default_incoming_dmg:
+                # the same steps as below without the calls, crit is the expected crit
+                if not reusable:
+                    outgoing = unit.outgoing_dmg_multiplier(target, tags)
+                elif outgoing_key != (tags.id, unit.runtime_stats.version):
+                    # taking damage can change the attacker's stats, e.g. a counter debuff, so the key has the version
+                    outgoing = unit.outgoing_dmg_multiplier(target, tags)
+                    outgoing_key = (tags.id, unit.runtime_stats.version)
+                dmg, break_dmg = dmg_and_break
+                dmg *= outgoing * target.incoming_dmg_multiplier(unit, tags)
+                if tags[-1] not in target.weaknesses:
+                    break_dmg = 0
+                dmg_and_break = (dmg, break_dmg)
+                crit = False
             else:
-                raise TypeError("unknown command type " + command_type)
-        # check if any character wants to run extra commands and executes them
-        # e.g. Luocha's passive healing from his trace "Sanctified" is an extra command
-        # recursively resolve all extra commands, because extra commands may cause more extra commands
-        for time_and_unit in self.queue:
-            unit = time_and_unit[1]
-            commands = unit.check_extra_commands(self.enemies, self.players, self.blackboard)
-            if commands:
-                self.run_commands(commands)
-                break
-                # break here because the recursion already resolves all units' extra commands
+                # it's divided into many steps so special effects can be applied at each step
+                # calculate amended dmg with the attacker's dmg increase, crit, etc.
+                dmg_and_break = unit.amend_outgoing_dmg(dmg_and_break, target, tags, self.enemies, self.players)
+                # calculate crit dmg (expected dmg by default)
+                dmg_and_break, crit = unit.crit_dmg(dmg_and_break, target, tags, self.enemies, self.players)
+                # calculate final dmg with the target's defence, resistance, etc.
+                dmg_and_break = target.reduce_incoming_dmg(dmg_and_break, unit, tags, self.enemies, self.players)
+                dmg, break_dmg = dmg_and_break
+            # record the dmg
+            tag_id = tags.id
+            if tag_id in dmg_dealt_by_tags:
+                dmg_dealt_by_tags[tag_id] += dmg
+                break_dmg_dealt_by_tags[tag_id] += break_dmg
+            else:
+                dmg_dealt_by_tags[tag_id] = dmg
+                break_dmg_dealt_by_tags[tag_id] = break_dmg
+            message_data.append((target, dmg_and_break, tags, crit))
+            self.battle_log.format(DETAILS, format_dmg, target, dmg)
+            # take the dmg
+            command_batches.append(target.take_dmg(dmg_and_break, unit, tags, self.enemies, self.players))
+            if self.auto_heal_mode:
+                target.hp = target.runtime_stats["HP"]
+        self.battle_log.write(DETAILS, "\n")
+        message_data = tuple(message_data)
+        self.broadcast(DMG, unit, message_data)
+        yield unit.end_dmg(message_data, self.players, self.enemies)
+        for commands in command_batches:
+            yield commands
+
+    def run_start_atk(self, unit, data):
+        """
+        Starts an attack.
+        """
+        self.broadcast(START_ATK, unit, data)
+        yield unit.start_atk(data, self.enemies, self.players)
+
+    def run_end_atk(self, unit, data):
+        """
+        Ends an attack and lets the targets restore energy.
+        """
+        self.broadcast(END_ATK, unit, data)
+        yield unit.end_atk(data, self.enemies, self.players)
+        for target in data:
+            energy_restore = 10
+            yield target.end_taking_atk(energy_restore, self.enemies, self.players)
+
+    def run_lose_sp(self, unit, data):
+        """
+        Consumes skill points.
+        """
+        self.broadcast(LOSE_SP, unit, data)
+        self.sp -= data
+        if self.sp < 0:
+            raise ValueError("skill points less than 0")
+
+    def run_gain_sp(self, unit, data):
+        """
+        Generates skill points up to the cap.
+        """
+        original_sp = self.sp
+        self.sp += data
+        if self.sp > self.sp_cap:
+            self.sp = self.sp_cap
+        actual_sp_gained = self.sp - original_sp
+        if actual_sp_gained:
+            self.broadcast(GAIN_SP, unit, actual_sp_gained)
+
+    def run_break(self, unit, data):
+        """
+        Breaks the targets' weakness.
+        """
+        self.broadcast(BREAK, unit, data)
+        for target, dmg_type in data:
+            self.battle_log.format(DETAILS, format_break, target)
+            yield target.weakness_break(dmg_type, unit, self.enemies, self.players)
+
+    def run_heal(self, unit, data):
+        """
+        Heals the targets.
+        """
+        # the messages record actual healing (not counting excess healing)
+        message_data = []
+        for target, hp, in data:
+            hp = unit.amend_outgoing_healing(hp, target, self.enemies, self.players)
+            hp = unit.amend_incoming_healing(hp, target, self.enemies, self.players)
+            hp = target.take_healing(hp, unit, self.enemies, self.players)
+            message_data.append((target, hp))
+            self.battle_log.format(DETAILS, format_heal, target, hp)
+        self.battle_log.write(DETAILS, "\n")
+        message_data = tuple(message_data)
+        self.broadcast(HEAL, unit, message_data)
+
+    def run_consume_hp(self, unit, data):
+        """
+        Consumes the targets' HP.
+        """
+        # the messages record actual consumption (can't go below 1 HP)
+        message_data = []
+        for target, hp, in data:
+            hp = target.consume_hp(hp, unit, self.enemies, self.players)
+            if self.auto_heal_mode:
+                target.hp = target.runtime_stats["HP"]
+            self.battle_log.format(DETAILS, format_consume_hp, target, hp)
+            message_data.append((target, hp))
+        self.battle_log.write(DETAILS, "\n")
+        message_data = tuple(message_data)
+        self.broadcast(CONSUME_HP, unit, message_data)
+
+    def run_buff(self, unit, data):
+        """
+        Buffs the targets.
+        """
+        self.broadcast(BUFF, unit, data)
+        for target, buff in data:
+            target.add_buff(buff)
+
+    def run_debuff(self, unit, data):
+        """
+        Tries to debuff the targets.
+        """
+        # the messages record successfully applied debuffs
+        message_data = []
+        for target, chance, debuff in data:
+            chance = unit.amend_outgoing_effect_chance(chance, target, self.enemies, self.players)
+            chance = target.amend_incoming_effect_chance(chance, debuff, unit, self.enemies, self.players)
+            if target.maybe_add_debuff(chance, debuff):
+                message_data.append((target, debuff))
+        message_data = tuple(message_data)
+        self.broadcast(DEBUFF, unit, message_data)
+
+    def run_advance(self, unit, data):
+        """
+        Advances the targets' actions.
+        """
+        self.broadcast(ADVANCE, unit, data)
+        for target, percentage, in data:
+            self.distances[target] -= percentage * 10000
+            if self.distances[target] < 0:
+                self.distances[target] = 0
+
+    def run_delay(self, unit, data):
+        """
+        Delays the targets' actions.
+        """
+        self.broadcast(DELAY, unit, data)
+        for target, percentage, in data:
+            self.distances[target] += percentage * 10000
+
+    def run_regenerate_energy(self, unit, data):
+        """
+        Restores the targets' energy.
+        """
+        self.broadcast(REGENERATE_ENERGY, unit, data)
+        for target, energy, in data:
+            target.energy += energy
+
+    def broadcast(self, code, unit, data):
+        """
+        Writes an event on the blackboard.
+
+        Parameters:
+        ----------
+        code: int
+            The code of the command/action type
+        unit: Unit
+            The unit that proposed the command/action
+        data: Any
+            The data of the event
+        """
+        self.blackboard.append(Event(code, unit, data))
+        if self.trace is not None:
+            self.trace.record(self.time_passed, code, unit, data)
+
+    def find_subscribers(self, subscribers, start):
+        """
+        Finds the units subscribed to the events written on the blackboard since the given position.
+
+        Parameters:
+        ----------
+        subscribers: dict
+            Either extra_commands_subscribers or extra_action_subscribers
+        start: int
+            The position on the blackboard to start from
+
+        Returns:
+        -------
+        A set of units
+        """
+        found = set()
+        blackboard = self.blackboard
+        # the blackboard knows where the events of each code are, so only the subscribed codes are looked up
+        for code in subscribers:
+            if code == "All" or blackboard.written_since(code, start):
+                found.update(subscribers[code])
+        return found
 
     def check_ult(self):
         """
@@ -364,14 +711,45 @@ class RailOperatingSystem:
         Keeps scanning until no one ults.
         If anyone ults, resolve any resulting extra turns.
         """
+        self.run_checks([(self.ult_step, None)])
+
+    def check_extra_turn(self):
+        """
+        Checks if any character wants to take extra turns and executes them
+        """
+        self.run_checks([(self.extra_turn_step, None)])
+
+    def run_checks(self, stack):
+        """
+        Runs the ultimate and extra turn checks on a work stack.\n
+        Ultimates can cause extra turns, and extra turns can enable ultimates and more extra turns. Each step pushes
+        the steps that follow it, and the stack runs the last one pushed first, so the steps run in the same order as
+        if they called each other, without nesting Python calls.
+
+        Parameters:
+        ----------
+        stack: list
+            The steps to run, (method, argument) pairs where method(stack, argument) runs the step
+        """
+        while stack:
+            step, argument = stack.pop()
+            step(stack, argument)
+
+    def ult_step(self, stack, argument):
+        """
+        The step of run_checks(.) that runs the ultimates, see check_ult(.).
+        """
         ult_found_ever = False
         # if someone uses ultimate like Tingyun's charge, it might cause other players to want to use ultimate
         # we need to keep scanning until we can't find any ultimate
+        candidates = self.ult_candidates
         ult_found_this_round = True
-        while ult_found_this_round:
+        while ult_found_this_round and candidates:
             ult_found_this_round = False
-            # scan every player character
+            # scan every player character with enough energy, in order
             for unit in self.players:
+                if unit not in candidates:
+                    continue
                 # if they can and want to use ultimate, they will return an action
                 action = unit.try_activate_ult(self.enemies, self.players)
                 if action:
@@ -381,34 +759,102 @@ class RailOperatingSystem:
                     self.run_action(action)
         # ultimates can cause someone to take an extra turn (like Seele's ultimate kills an enemy)
         if ult_found_ever:
-            self.check_extra_turn()
+            stack.append((self.extra_turn_step, None))
             # if the extra turn enables any ultimate it will check them automatically
 
-    def check_extra_turn(self):
+    def extra_turn_step(self, stack, argument):
         """
-        Checks if any character wants to take extra turns and executes them
+        The step of run_checks(.) that finds the next extra turn, see check_extra_turn(.).
         """
-        for time_and_unit in self.queue:
-            unit = time_and_unit[1]
+        requests = self.extra_turn_requests
+        pollers = self.extra_turn_pollers
+        if not requests and not pollers:
+            return
+        if requests:
+            # only the units in the queue are asked, a request from any other unit would never be used up
+            requests.intersection_update(self.queue.entries)
+        # the units are still checked in the order of the queue
+        for unit in self.queue.units():
+            if unit in requests:
+                requests.discard(unit)
+            elif unit not in pollers:
+                continue
             action = unit.check_extra_turn(self.enemies, self.players, self.sp, self.blackboard)
             if action:
                 # extra turns don't have turn start/end phases so they consume no buffs/debuffs
                 unit.in_extra_turn = True
+                # the steps of the extra turn are pushed in reverse order
+                # after it, check if any character wants to take extra turns, extra turns may cause more extra turns
+                stack.append((self.extra_turn_step, None))
+                stack.append((self.end_extra_turn_step, unit))
+                stack.append((self.ult_step, None))
+                stack.append((self.action_step, action))
                 # somehow, in Seele's extra turn, no one can use ultimate before she chooses an action
                 # maybe extra turns have different priority levels
                 if unit.low_extra_turn_priority:
-                    self.check_ult()
-                self.run_action(action)
-                self.check_ult()
-                unit.in_extra_turn = False
-                # check if any character wants to take extra turns and executes them
-                # recursively resolve all extra turns, because extra turns may cause more extra turns
-                self.check_extra_turn()
+                    stack.append((self.ult_step, None))
                 break
-                # break here because the recursion already resolves all units' extra turns
+
+    def action_step(self, stack, action):
+        """
+        The step of run_checks(.) that runs the action of an extra turn.
+        """
+        self.run_action(action)
+
+    def end_extra_turn_step(self, stack, unit):
+        """
+        The step of run_checks(.) that ends an extra turn.
+        """
+        unit.in_extra_turn = False
 
     def run(self):
-        while self.tic():
-            pass
-        if self.show_action:
-            stdout.write(self.battle_log)
+        try:
+            while self.tic():
+                pass
+        finally:
+            self.end()
+
+    def end(self):
+        """
+        Ends the battle: puts back the decorators of the units and closes the battle log and the trace.\n
+        tic(.) and run(.) call it when the battle is over, calling it again does nothing. A battle driven by tic(.)
+        that is stopped early should call it.
+        """
+        if self.ended:
+            return
+        self.ended = True
+        if self.flatten:
+            # the units can be decorated again after the battle
+            for unit in self.enemies + self.players:
+                unflatten_decorators(unit)
+        self.battle_log.close()
+        if self.trace is not None:
+            self.trace.close()
+
+    # the handlers of each type of command/action
+    # the types can be looked up directly so adding new types doesn't slow down the existing ones
+    command_handlers = {
+        DMG: run_dmg,
+        START_ATK: run_start_atk,
+        END_ATK: run_end_atk,
+        LOSE_SP: run_lose_sp,
+        GAIN_SP: run_gain_sp,
+        BREAK: run_break,
+        HEAL: run_heal,
+        CONSUME_HP: run_consume_hp,
+        BUFF: run_buff,
+        DEBUFF: run_debuff,
+        ADVANCE: run_advance,
+        DELAY: run_delay,
+        REGENERATE_ENERGY: run_regenerate_energy
+    }
+    action_handlers = {
+        BASIC_ATK: step_action("basic_atk"),
+        SKILL: step_action("skill"),
+        ULTIMATE: step_action("ultimate"),
+        TALENT: step_action("talent"),
+        # skips a turn (frozen, etc.)
+        PASS: lambda system, unit, targets: None,
+        # most units won't have this action
+        EXTRA_MOVE: step_action("extra_move")
+    }
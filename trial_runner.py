@@ -0,0 +1,193 @@
+from concurrent.futures import ProcessPoolExecutor
+from os import cpu_count
+from math import sqrt
+from random import Random
+from rail_operating_system import *
+
+
+class TrialResults:
+    """
+    The damage records of many battles merged together.
+
+    Attributes:
+    ----------
+    seed: int
+        The seed of the batch, battle i was seeded with battle_seed(seed, i)
+    trials: int
+        How many battles were run
+    dmg_dealt_record: dict
+        The total damage each unit (by name) dealt over all battles classified into different sources
+    break_dmg_dealt_record: dict
+        The total break damage each unit (by name) dealt over all battles classified into different sources
+    total_dmg: dict
+        The total damage each unit dealt in each battle, in the order of the battles
+    """
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.trials = 0
+        self.dmg_dealt_record = {}
+        self.break_dmg_dealt_record = {}
+        self.total_dmg = {}
+
+    def add_battle(self, units):
+        """
+        Adds the records of one finished battle.
+
+        Parameters:
+        ----------
+        units: list
+            The units of the battle
+        """
+        self.trials += 1
+        for unit in units:
+            add_records(self.dmg_dealt_record.setdefault(unit.name, {}), unit.dmg_dealt_record)
+            add_records(self.break_dmg_dealt_record.setdefault(unit.name, {}), unit.break_dmg_dealt_record)
+            self.total_dmg.setdefault(unit.name, []).append(sum(unit.dmg_dealt_record.values()))
+
+    def merge(self, other):
+        """
+        Adds the records of another batch of battles. The other batch is treated as the later battles.
+
+        Parameters:
+        ----------
+        other: TrialResults
+            The results to be merged
+        """
+        self.trials += other.trials
+        for name in other.dmg_dealt_record:
+            add_records(self.dmg_dealt_record.setdefault(name, {}), other.dmg_dealt_record[name])
+            add_records(self.break_dmg_dealt_record.setdefault(name, {}), other.break_dmg_dealt_record[name])
+            self.total_dmg.setdefault(name, []).extend(other.total_dmg[name])
+
+    def mean_dmg(self, name):
+        """
+        Returns:
+        -------
+        The average damage the unit dealt per battle
+        """
+        return sum(self.total_dmg[name]) / self.trials
+
+    def std_dmg(self, name):
+        """
+        Returns:
+        -------
+        The standard deviation of the damage the unit dealt per battle
+        """
+        if self.trials < 2:
+            return 0
+        mean = self.mean_dmg(name)
+        return sqrt(sum([(dmg - mean) ** 2 for dmg in self.total_dmg[name]]) / (self.trials - 1))
+
+    def distribution(self, name):
+        """
+        Returns:
+        -------
+        The share of each damage source in the unit's total damage
+        """
+        record = self.dmg_dealt_record[name]
+        total_dmg = sum(record.values())
+        if total_dmg == 0:
+            return {}
+        return {tag: record[tag] / total_dmg for tag in record}
+
+    def summary(self, names=None):
+        """
+        Formats the results the same way test.py does.
+
+        Parameters:
+        ----------
+        names: list
+            The units to be shown, all units by default
+
+        Returns:
+        -------
+        The summary as a string
+        """
+        if names is None:
+            names = list(self.dmg_dealt_record)
+        lines = ["Average Results Over " + str(self.trials) + " trials:"]
+        for name in names:
+            lines.append(
+                name + " did " + str(round(self.mean_dmg(name))) + " DMG (std " + str(round(self.std_dmg(name))) + ")"
+            )
+            distribution = self.distribution(name)
+            if distribution:
+                lines.append("; ".join([tag + ": " + str(round(distribution[tag] * 100, 1)) + "%" for tag in distribution]))
+        return "\n".join(lines) + "\n"
+
+
+def add_records(total, record):
+    """
+    Adds a damage record into a total record.
+    """
+    for tag in record:
+        if tag in total:
+            total[tag] += record[tag]
+        else:
+            total[tag] = record[tag]
+
+
+def run_chunk(battle_factory, seed, start, stop, system_options):
+    """
+    Runs the battles start, start + 1, ..., stop - 1 of a batch. This is the work unit sent to the worker processes.
+
+    Returns:
+    -------
+    The TrialResults of these battles
+    """
+    results = TrialResults(seed)
+    for index in range(start, stop):
+        enemies, players = battle_factory()
+        system = RailOperatingSystem(enemies, players, seed=battle_seed(seed, index), **system_options)
+        system.run()
+        results.add_battle(players + enemies)
+    return results
+
+
+def run_trials(battle_factory, trials, seed=None, workers=None, chunk_size=None, **system_options):
+    """
+    Runs many battles on a pool of processes and merges their damage records.\n
+    Battle i is seeded with battle_seed(seed, i), so the results only depend on the seed, not on how the battles are
+    split between the processes. To look into a single battle, rebuild it with that seed.
+
+    Parameters:
+    ----------
+    battle_factory: function
+        A function that builds a new battle and returns (enemies, players)\n
+        It is sent to the worker processes, so it must be defined at the top level of a module.
+    trials: int
+        How many battles to run
+    seed: int
+        The seed of the batch, a random one is picked if it is None
+    workers: int
+        How many processes to use, all cpus by default\n
+        With 1 worker, the battles run in this process.
+    chunk_size: int
+        How many battles are sent to a worker at a time, about 4 chunks per worker by default
+    system_options:
+        Other arguments of RailOperatingSystem, e.g. battle_length=850, auto_heal_mode=True
+
+    Returns:
+    -------
+    A TrialResults object
+    """
+    if seed is None:
+        seed = Random().getrandbits(64)
+    if workers is None:
+        workers = cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, trials // (workers * 4))
+    results = TrialResults(seed)
+    if workers == 1:
+        results.merge(run_chunk(battle_factory, seed, 0, trials, system_options))
+        return results
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [
+            executor.submit(run_chunk, battle_factory, seed, start, min(start + chunk_size, trials), system_options)
+            for start in range(0, trials, chunk_size)
+        ]
+        # merge in the order of the battles so the per-battle lists are in order too
+        for future in futures:
+            results.merge(future.result())
+    return results